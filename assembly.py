@@ -0,0 +1,720 @@
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ffmpeg_utils import PipedCommand, run_ffmpeg
+from kenburns import build_zoom_command
+from ffmpeg_caps import get_capabilities
+from media_probe import get_probe_cache
+from cache_utils import DiskLRUCache, get_cache_dir, file_identity, make_cache_key
+
+# Threads given to each chunk encode. The pool size is derived from this so
+# N parallel encodes don't oversubscribe the machine.
+FFMPEG_THREADS_PER_CHUNK = 4
+FADE_DURATION = 0.5 # Duration for fade in/out
+
+# Transitions. Chunks are rendered without them; each clip gets keyframes
+# TRANSITION_EDGE from both ends so its edges can be cut off by stream copy
+# and only those pieces re-encoded with the transition.
+FADE_TRANSITIONS = {"Fade Black": "black", "Fade White": "white"} # fade/afade (no overlap)
+XFADE_TRANSITIONS = {"Crossfade": "fade", "Dissolve": "dissolve", "Wipe Left": "wipeleft",
+                     "Wipe Right": "wiperight", "Slide Left": "slideleft"} # xfade/acrossfade blends
+TRANSITIONS = ("None",) + tuple(FADE_TRANSITIONS) + tuple(XFADE_TRANSITIONS)
+SINGLE_PASS_TRANSITIONS = ("None",) + tuple(FADE_TRANSITIONS)
+TRANSITION_EDGE = FADE_DURATION
+MIN_SPLIT_INTERIOR = 0.2 # Shorter clips aren't split (hard cuts on both sides)
+
+# Rendered chunks are kept across renders; bump the version when the
+# chunk recipe changes in a way the command line doesn't capture.
+CHUNK_CACHE_VERSION = 3
+CHUNK_CACHE_MAX_BYTES = 5 * 1024 ** 3
+
+
+class AssemblyCancelled(Exception):
+    """ Raised by assemble_video when its cancel_event is set """
+
+
+def default_chunk_workers(threads_per_chunk=FFMPEG_THREADS_PER_CHUNK):
+    """ Default pool size: cores / threads-per-ffmpeg (at least 1) """
+    cores = os.cpu_count() or 1
+    return max(1, cores // max(1, threads_per_chunk))
+
+
+def build_fade_filters(transition, target_dur, has_audio):
+    """ Returns (video_fade, audio_fade) filter suffixes for a chunk """
+    # Fade In (Start of clip) and Fade Out (End of clip)
+    # Video Fade: fade=t=in:st=0:d=0.5,fade=t=out:st={dur-0.5}:d=0.5
+    # Audio Fade: afade=t=in:ss=0:d=0.5,afade=t=out:st={dur-0.5}:d=0.5
+    v_fade = ""
+    a_fade = ""
+
+    if transition in ["Fade Black", "Fade White"]:
+        color = "black" if transition == "Fade Black" else "white"
+        st_out = max(0, target_dur - FADE_DURATION)
+
+        # Video Fades
+        v_fade = f",fade=t=in:st=0:d={FADE_DURATION}:color={color}"
+        v_fade += f",fade=t=out:st={st_out}:d={FADE_DURATION}:color={color}"
+
+        # Audio Fades (Only if video input exists)
+        if has_audio:
+            a_fade = f",afade=t=in:ss=0:d={FADE_DURATION}"
+            a_fade += f",afade=t=out:st={st_out}:d={FADE_DURATION}"
+
+    return v_fade, a_fade
+
+
+def build_atempo_chain(speed):
+    """ atempo only accepts 0.5-2.0, so larger factors are chained """
+    audio_chain = []
+    remaining_speed = speed
+    while remaining_speed > 2.0:
+        audio_chain.append("atempo=2.0")
+        remaining_speed /= 2.0
+    while remaining_speed < 0.5:
+        audio_chain.append("atempo=0.5")
+        remaining_speed /= 0.5
+    audio_chain.append(f"atempo={remaining_speed}")
+    return ",".join(audio_chain)
+
+
+def splits_at_edges(target_dur):
+    """ True if a clip is long enough to be cut into head / interior / tail at its edge keyframes """
+    return target_dur >= 2 * TRANSITION_EDGE + MIN_SPLIT_INTERIOR
+
+
+def edge_times(target_dur):
+    """ Keyframe (and later split) times of a clip's edges """
+    return f"{TRANSITION_EDGE:.3f},{target_dur - TRANSITION_EDGE:.3f}"
+
+
+def build_chunk_command(clip, chunk_out, settings, threads=FFMPEG_THREADS_PER_CHUNK):
+    """
+    Builds the ffmpeg command that renders one clip to chunk_out (None if nothing to render;
+    a PipedCommand for image clips, whose zoom frames are generated in Python).
+    Chunks carry no transition and always have 44.1kHz stereo audio, so any two of
+    them join by stream copy and a transition change never re-renders them.
+    """
+    input_video = clip.get('video')
+    input_image = clip.get('image') # Fallback when no video is assigned
+    target_dur = clip['target_dur']
+    source_dur = clip.get('source_dur', 0)
+
+    caps = get_capabilities()
+    encoder = caps.h264_encoder()
+    keyframes = ["-force_key_frames", edge_times(target_dur)] if splits_at_edges(target_dur) else []
+    silence = ["-f", "lavfi", "-i", f"anullsrc=channel_layout=stereo:sample_rate=44100:duration={target_dur}"]
+
+    if input_image and not input_video:
+        # --- ZOOM GENERATION ---
+        # Frames are generated from a pre-resized still (sub-pixel crops, see kenburns)
+        zoom_factor = settings.get("zoom_amount", 110) / 100.0
+        return build_zoom_command(input_image, [
+            *silence,
+            "-map", "0:v", "-map", "1:a",
+            "-c:v", encoder, "-pix_fmt", "yuv420p", *keyframes, "-c:a", "aac",
+            "-threads", str(threads),
+            "-t", str(target_dur),
+            "-y", chunk_out
+        ], target_dur, zoom_factor)
+
+    if input_video:
+        # --- VIDEO SPEED ADJUST ---
+        speed = source_dur / target_dur
+        speed = max(0.1, min(speed, 100.0))
+
+        video_filter = f"setpts=PTS/{speed}"
+        # Scale/Pad
+        video_filter += ",scale=1280:720:force_original_aspect_ratio=decrease,pad=1280:720:(ow-iw)/2:(oh-ih)/2,fps=30"
+
+        cmd = ["ffmpeg", "-i", input_video]
+        if has_audio_stream(input_video):
+            audio = ["-map", "0:a:0", "-filter:a", f"{build_atempo_chain(speed)},aresample=44100,aformat=channel_layouts=stereo"]
+        else:
+            # Silent track keeps every chunk concat-compatible
+            cmd += silence
+            audio = ["-map", "1:a"]
+        return cmd + [
+            "-map", "0:v:0", *audio,
+            "-filter:v", video_filter,
+            "-c:v", encoder, "-pix_fmt", "yuv420p", *keyframes, "-c:a", "aac",
+            "-threads", str(threads),
+            "-y", chunk_out
+        ]
+
+    return None
+
+
+def chunk_cache_key(clip, settings):
+    """
+    Content key for a rendered chunk: identity of the source file plus the
+    exact encode recipe (durations, zoom and encoder args). The transition is
+    not part of it: chunks are rendered without one.
+    """
+    source = clip.get('video') or clip.get('image')
+    if not source or not os.path.exists(source):
+        return None
+    # Paths/threads don't change the output, so they are left out of the recipe
+    recipe = build_chunk_command(clip, "", settings, threads=0)
+    if isinstance(recipe, PipedCommand):
+        recipe = recipe.argv # The piped frames follow from the source, durations and zoom (all in the key)
+    return make_cache_key(
+        CHUNK_CACHE_VERSION, file_identity(source),
+        clip['target_dur'], clip.get('source_dur', 0),
+        settings.get("zoom_amount", 110),
+        recipe
+    )
+
+
+def open_chunk_cache(max_bytes=CHUNK_CACHE_MAX_BYTES):
+    return DiskLRUCache(get_cache_dir("chunks"), max_bytes, suffix=".mp4")
+
+
+# Cached chunks that running renders (queue slots / CLI jobs share this process) have yet to concat
+_pinned_chunks = {}
+_pinned_lock = threading.Lock()
+
+
+def _pin_chunks(paths):
+    with _pinned_lock:
+        for path in paths:
+            _pinned_chunks[path] = _pinned_chunks.get(path, 0) + 1
+
+
+def _unpin_chunks(paths):
+    with _pinned_lock:
+        for path in paths:
+            count = _pinned_chunks.get(path, 0) - 1
+            if count > 0:
+                _pinned_chunks[path] = count
+            else:
+                _pinned_chunks.pop(path, None)
+
+
+def _pinned_chunk_paths():
+    with _pinned_lock:
+        return set(_pinned_chunks)
+
+
+def run_chunk_command(cmd, duration=0.0, on_progress=None, cancel_event=None):
+    if cancel_event is not None and cancel_event.is_set():
+        return False # Cancelled before this chunk got a slot
+    if isinstance(cmd, PipedCommand):
+        returncode, _ = run_ffmpeg(cmd.argv, duration, on_progress, cancel_event=cancel_event, stdin_chunks=cmd.stdin_chunks)
+    else:
+        returncode, _ = run_ffmpeg(cmd, duration, on_progress, cancel_event=cancel_event)
+    return returncode == 0
+
+
+def encode_chunks(jobs, max_workers=None, on_chunk_done=None, durations=None, on_progress=None,
+                  cancel_event=None, on_chunk_written=None):
+    """
+    Encodes (cmd, chunk_out) jobs concurrently on a bounded pool.
+    A job with cmd=None is already rendered (e.g. a cache hit) and is passed through.
+    on_chunk_done(index, total) is called in job order, so progress never
+    jumps backwards. on_progress(percent, fps, speed) reports the whole batch,
+    weighting each chunk by its duration. Returns one entry per job: the chunk
+    path, or None if ffmpeg failed to produce it (or cancel_event was set).
+    on_chunk_written(index, path) sees each freshly encoded chunk in job order and
+    may return a new path for it (e.g. after moving it into the chunk cache).
+    """
+    total = len(jobs)
+    workers = max(1, min(max_workers or default_chunk_workers(), total or 1))
+    results = []
+
+    durations = durations or [1.0] * total
+    total_dur = sum(durations) or 1.0
+    done_pct = [100.0 if cmd is None else 0.0 for cmd, _ in jobs]
+    lock = threading.Lock()
+
+    def chunk_progress(i):
+        def report(percent, fps, speed):
+            with lock:
+                done_pct[i] = percent
+                overall = sum(p * d for p, d in zip(done_pct, durations)) / total_dur
+            on_progress(overall, fps, speed)
+        return report if on_progress else None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_chunk_command, cmd, durations[i], chunk_progress(i), cancel_event) if cmd else None
+            for i, (cmd, _) in enumerate(jobs)
+        ]
+
+        # Collect in submission order: a finished later chunk waits for earlier ones
+        for i, (future, (_, chunk_out)) in enumerate(zip(futures, jobs)):
+            ok = future.result() if future is not None else True
+            path = chunk_out if ok and os.path.exists(chunk_out) else None
+            if path and future is not None and on_chunk_written:
+                path = on_chunk_written(i, path) or path
+            if on_chunk_done:
+                on_chunk_done(i, total)
+            results.append(path)
+
+    return results
+
+
+def has_audio_stream(path):
+    """ True if ffprobe finds at least one audio stream in path """
+    try:
+        return get_probe_cache().has_audio(path)
+    except Exception:
+        return False
+
+
+def build_split_command(chunk, out_pattern, list_path, target_dur):
+    """ Stream-copies a chunk into head / interior / tail at its edge keyframes (times listed as CSV) """
+    # Timestamps must not be shifted for B-frame delay, or the cut lands a GOP late;
+    # the delta (half a frame at 30fps) absorbs rounding of the forced keyframe times
+    return [
+        "ffmpeg", "-i", chunk, "-map", "0", "-c", "copy", "-avoid_negative_ts", "disabled",
+        "-f", "segment", "-segment_times", edge_times(target_dur), "-segment_time_delta", "0.017",
+        "-segment_format", "mp4",
+        "-segment_list", list_path, "-segment_list_type", "csv", "-reset_timestamps", "1",
+        "-y", out_pattern
+    ]
+
+
+def read_split_list(list_path):
+    """ Segment CSV -> [(path, duration)]; [] unless the chunk split into exactly three pieces """
+    pieces = []
+    try:
+        with open(list_path, "r", encoding="utf-8") as f:
+            for line in f:
+                name, start, end = line.strip().rsplit(",", 2)
+                pieces.append((os.path.join(os.path.dirname(list_path), name.strip('"')), float(end) - float(start)))
+    except (OSError, ValueError):
+        return []
+    # A missing edge keyframe (e.g. an encoder that ignores forced keyframes) merges pieces
+    return pieces if len(pieces) == 3 else []
+
+
+def build_edge_fade_command(piece, out_path, color, fade_in, threads=FFMPEG_THREADS_PER_CHUNK):
+    """ Fade the first clip in from / the last clip out to a colour (piece = (path, duration)) """
+    path, dur = piece
+    d = min(FADE_DURATION, dur)
+    st = 0 if fade_in else max(0.0, dur - d)
+    kind = "in" if fade_in else "out"
+    return [
+        "ffmpeg", "-i", path,
+        "-vf", f"fade=t={kind}:st={st:.3f}:d={d:.3f}:color={color}",
+        "-af", f"afade=t={kind}:st={st:.3f}:d={d:.3f}",
+        "-c:v", get_capabilities().h264_encoder(), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-ar", "44100", "-ac", "2",
+        "-threads", str(threads), "-y", out_path
+    ]
+
+
+def build_boundary_command(tail, head, transition, out_path, threads=FFMPEG_THREADS_PER_CHUNK):
+    """
+    Re-encodes one clip boundary: clip A's tail piece followed by clip B's head
+    piece (each (path, duration)). The result is exactly as long as both pieces,
+    so the timeline (and slide timing) is unchanged.
+    Fade Black/White fade A out and B in, as the old per-chunk fades did.
+    xfade blends hold A's last and B's first frame so both span the whole
+    window. Audio never overlaps: A fades out and B fades in, back to back.
+    """
+    (tail_path, ta), (head_path, hb) = tail, head
+    window = ta + hb
+    da, db = min(FADE_DURATION, ta), min(FADE_DURATION, hb)
+    audio = (
+        f"[0:a]afade=t=out:st={ta - da:.3f}:d={da:.3f}[a0];"
+        f"[1:a]afade=t=in:st=0:d={db:.3f}[a1];"
+    )
+    if transition in FADE_TRANSITIONS:
+        color = FADE_TRANSITIONS[transition]
+        graph = (
+            f"[0:v]fade=t=out:st={ta - da:.3f}:d={da:.3f}:color={color},setsar=1[v0];"
+            f"[1:v]fade=t=in:st=0:d={db:.3f}:color={color},setsar=1[v1];"
+            f"{audio}"
+            f"[v0][a0][v1][a1]concat=n=2:v=1:a=1[v][a]"
+        )
+    else:
+        graph = (
+            f"[0:v]settb=AVTB,setsar=1,tpad=stop_mode=clone:stop_duration={hb + 0.1:.3f}[v0];"
+            f"[1:v]settb=AVTB,setsar=1,tpad=start_mode=clone:start_duration={ta:.3f}[v1];"
+            f"[v0][v1]xfade=transition={XFADE_TRANSITIONS[transition]}:duration={window:.3f}:offset=0[v];"
+            f"{audio}"
+            f"[a0][a1]concat=n=2:v=0:a=1[a]"
+        )
+    return [
+        "ffmpeg", "-i", tail_path, "-i", head_path,
+        "-filter_complex", graph, "-map", "[v]", "-map", "[a]",
+        "-c:v", get_capabilities().h264_encoder(), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-ar", "44100", "-ac", "2",
+        "-threads", str(threads), "-t", f"{window:.3f}", "-y", out_path
+    ]
+
+
+def apply_transitions(chunks, durations, transition, temp_dir, max_workers=None, on_progress=None, cancel_event=None):
+    """
+    Transition engine for the chunked path. Returns the pieces to concatenate (in order).
+    Every chunk is split by stream copy at its edge keyframes. Only the pieces
+    touching a boundary (about FADE_DURATION each side) are re-encoded; the
+    interiors are copied. A boundary that fails to render falls back to a hard cut.
+    """
+    split_jobs = []
+    for i, (chunk, dur) in enumerate(zip(chunks, durations)):
+        list_path = os.path.join(temp_dir, f"split_{i:04d}.csv")
+        cmd = build_split_command(chunk, os.path.join(temp_dir, f"piece_{i:04d}_%d.mp4"), list_path, dur) if splits_at_edges(dur) else None
+        split_jobs.append((cmd, list_path if cmd else chunk))
+    lists = encode_chunks(split_jobs, max_workers, cancel_event=cancel_event)
+    edges = [read_split_list(p) if cmd and p else [] for (cmd, _), p in zip(split_jobs, lists)]
+
+    # Plan: each entry is a piece to copy, or (cmd, out, dur, fallback pieces) to encode
+    plan = []
+    last = len(chunks) - 1
+    fade_color = FADE_TRANSITIONS.get(transition)
+    for i, chunk in enumerate(chunks):
+        if not edges[i]:
+            plan.append(chunk)
+            continue
+        head, interior, tail = edges[i]
+        if i == 0 and fade_color:
+            out = os.path.join(temp_dir, "edge_start.mp4")
+            plan.append((build_edge_fade_command(head, out, fade_color, True), out, head[1], [head[0]]))
+        elif i == 0 or not edges[i - 1]:
+            plan.append(head[0]) # Hard cut from an unsplit previous clip
+        plan.append(interior[0])
+        if i == last and fade_color:
+            out = os.path.join(temp_dir, "edge_end.mp4")
+            plan.append((build_edge_fade_command(tail, out, fade_color, False), out, tail[1], [tail[0]]))
+        elif i < last and edges[i + 1]:
+            next_head = edges[i + 1][0]
+            out = os.path.join(temp_dir, f"boundary_{i:04d}.mp4")
+            plan.append((build_boundary_command(tail, next_head, transition, out), out, tail[1] + next_head[1],
+                         [tail[0], next_head[0]]))
+        else:
+            plan.append(tail[0])
+
+    encodes = [entry for entry in plan if isinstance(entry, tuple)]
+    rendered = encode_chunks([(cmd, out) for cmd, out, _, _ in encodes], max_workers,
+                             durations=[dur for _, _, dur, _ in encodes], on_progress=on_progress,
+                             cancel_event=cancel_event)
+    results = iter(rendered)
+    pieces = []
+    for entry in plan:
+        if not isinstance(entry, tuple):
+            pieces.append(entry)
+            continue
+        path = next(results)
+        if not path:
+            print(f"DEBUG: Transition render failed, hard cut instead: {entry[1]}")
+        pieces.extend([path] if path else entry[3])
+    return pieces
+
+
+def build_single_pass_command(clip_data, output_path, settings, graph_path):
+    """
+    Builds one ffmpeg invocation that renders the whole assembly:
+    per-clip speed/zoom/fades -> concat -> original audio mix -> loudnorm.
+    The filtergraph is written to graph_path (command lines get too long on Windows).
+    Ken Burns slides still use the 2x zoompan recipe here: kenburns frames need
+    stdin, and one process has only one. Single-pass zooms are therefore slower
+    than chunked ones and move slightly differently (whole-pixel crops).
+    Returns the command, or None if there is nothing to render.
+    """
+    transition = settings.get("transition", "None")
+    zoom_factor = settings.get("zoom_amount", 110) / 100.0
+    caps = get_capabilities()
+
+    inputs = []
+    chains = []
+    segments = []
+
+    for i, clip in enumerate(clip_data):
+        input_video = clip.get('video')
+        input_image = clip.get('image')
+        target_dur = clip['target_dur']
+        source_dur = clip.get('source_dur', 0)
+        idx = len(inputs) // 2 # Every input contributes exactly two args: "-i", path
+
+        if input_video:
+            v_fade, a_fade = build_fade_filters(transition, target_dur, True)
+            speed = max(0.1, min(source_dur / target_dur, 100.0))
+            inputs += ["-i", input_video]
+
+            chains.append(
+                f"[{idx}:v]setpts=(PTS-STARTPTS)/{speed}{v_fade},"
+                f"scale=1280:720:force_original_aspect_ratio=decrease,pad=1280:720:(ow-iw)/2:(oh-ih)/2,fps=30,"
+                f"setsar=1,format=yuv420p,trim=duration={target_dur}[v{i}]"
+            )
+            if has_audio_stream(input_video):
+                chains.append(
+                    f"[{idx}:a]asetpts=PTS-STARTPTS,{build_atempo_chain(speed)}{a_fade},"
+                    f"aresample=44100,aformat=channel_layouts=stereo,apad,atrim=duration={target_dur}[a{i}]"
+                )
+            else:
+                chains.append(f"anullsrc=channel_layout=stereo:sample_rate=44100,atrim=duration={target_dur}[a{i}]")
+
+        elif input_image:
+            v_fade, _ = build_fade_filters(transition, target_dur, False)
+            d_frames = int(target_dur * 30)
+            z_expr = f"1+({zoom_factor}-1)*(on/{d_frames})"
+            # No -loop here: zoompan emits d frames per input frame, so one still is enough
+            inputs += ["-i", input_image]
+
+            if caps.has_filter("zoompan"):
+                motion = f"zoompan=z='{z_expr}':x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':d={d_frames}:s=2560x1440:fps=30"
+            else:
+                motion = "loop=loop=-1:size=1,setpts=N/30/TB" # Build without zoompan: still image
+            chains.append(
+                f"[{idx}:v]{motion},"
+                f"scale=1280:720,setsar=1,format=yuv420p{v_fade},trim=duration={target_dur}[v{i}]"
+            )
+            chains.append(f"anullsrc=channel_layout=stereo:sample_rate=44100,atrim=duration={target_dur}[a{i}]")
+        else:
+            continue
+
+        segments.append(f"[v{i}][a{i}]")
+
+    if not segments:
+        return None
+
+    chains.append(f"{''.join(segments)}concat=n={len(segments)}:v=1:a=1[vcat][acat]")
+    audio_label = "acat"
+
+    # Original audio mix (generated audio is always present here, so always amix)
+    original_vid = settings.get("original_path")
+    if settings.get("enabled") and original_vid and os.path.exists(original_vid) and has_audio_stream(original_vid):
+        orig_idx = len(inputs) // 2
+        inputs += ["-i", original_vid]
+        gen_vol = settings.get("generated_vol", 0.25)
+        chains.append(
+            f"[acat]volume={gen_vol:.2f}[ag];[{orig_idx}:a]volume=1.0[ao];"
+            f"[ag][ao]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[amix]"
+        )
+        audio_label = "amix"
+
+    if settings.get("audio_norm") and caps.has_filter("loudnorm"):
+        chains.append(f"[{audio_label}]loudnorm=I=-16:TP=-1.5:LRA=11[anorm]")
+        audio_label = "anorm"
+
+    with open(graph_path, "w", encoding='utf-8') as f:
+        f.write(";\n".join(chains))
+
+    return [
+        "ffmpeg", *inputs,
+        "-filter_complex_script", graph_path,
+        "-map", "[vcat]", "-map", f"[{audio_label}]",
+        "-c:v", caps.h264_encoder(), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "192k",
+        "-y", output_path
+    ]
+
+
+def assemble_video(clip_data, output_path, settings=None, temp_dir=None, on_step=None, on_progress=None, cancel_event=None):
+    """
+    Renders clip_data into output_path (chunked or single-pass engine per settings).
+    on_step(current, total, msg) reports pipeline steps, on_progress(percent, fps, speed)
+    the running ffmpeg. Returns the final path; raises on failure, or
+    AssemblyCancelled once cancel_event is set. Chunks finished before a cancel
+    are kept in the chunk cache, so a re-run only encodes the rest.
+    """
+    settings = settings or {}
+    temp_dir = temp_dir or os.path.join(os.path.dirname(output_path), "temp_assembly")
+    def step(current, total, msg):
+        if on_step: on_step(current, total, msg)
+    def check_cancel():
+        if cancel_event is not None and cancel_event.is_set():
+            raise AssemblyCancelled("Render cancelled.")
+
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+
+    total = len(clip_data)
+    total_dur = sum(clip['target_dur'] for clip in clip_data)
+
+    transition = settings.get("transition", "None")
+    if settings.get("engine") == "single_pass" and transition not in SINGLE_PASS_TRANSITIONS:
+        # Blends overlap neighbouring clips, which the single-pass graph doesn't model
+        print(f"DEBUG: '{transition}' needs the chunked engine; using it")
+    elif settings.get("engine") == "single_pass":
+        # Whole assembly in one ffmpeg call: no chunk/concat/mix intermediates
+        step(0, 1, "Rendering (single pass)...")
+        graph_path = os.path.join(temp_dir, "graph.txt")
+        cmd = build_single_pass_command(clip_data, output_path, settings, graph_path)
+        if not cmd:
+            raise RuntimeError("No clips to render.")
+        returncode, err_tail = run_ffmpeg(cmd, total_dur, on_progress, cancel_event=cancel_event)
+        check_cancel()
+        if returncode != 0 or not os.path.exists(output_path):
+            raise RuntimeError(err_tail)
+        step(1, 1, "Rendering (single pass)...")
+        return output_path
+
+    chunk_cache = open_chunk_cache() if settings.get("use_chunk_cache", True) else None
+
+    pinned = [] # This render's cache files; other renders' evict() leaves them until we're done
+    try:
+        # 1. Process Clips (encoded concurrently, reported in order)
+        # Unchanged clips are served from the chunk cache instead of re-encoding
+        jobs = []
+        keys = []
+        for i, clip in enumerate(clip_data):
+            chunk_out = os.path.join(temp_dir, f"chunk_{i:04d}.mp4")
+            key = chunk_cache_key(clip, settings) if chunk_cache else None
+            cached = chunk_cache.get(key) if key else None
+            if cached:
+                jobs.append((None, cached))
+                _pin_chunks([cached])
+                pinned.append(cached)
+            else:
+                jobs.append((build_chunk_command(clip, chunk_out, settings), chunk_out))
+            keys.append(key)
+
+        hits = sum(1 for cmd, _ in jobs if cmd is None)
+        workers = settings.get("chunk_workers") or default_chunk_workers()
+        step(0, total + 2, f"Processing {total} clips ({hits} cached, {workers} parallel)...")
+        # Fresh chunks go into the cache as they finish, so an interrupted render resumes
+        def store_chunk(i, path):
+            if not keys[i]:
+                return path
+            cached = chunk_cache.put(keys[i], path)
+            _pin_chunks([cached])
+            pinned.append(cached)
+            return cached
+
+        processed_clips = encode_chunks(
+            jobs, workers,
+            lambda i, n: step(i+1, n + 2, f"Processed clip {i+1}/{n}..."),
+            durations=[clip['target_dur'] for clip in clip_data],
+            on_progress=on_progress,
+            cancel_event=cancel_event,
+            on_chunk_written=store_chunk if chunk_cache else None
+        )
+        check_cancel()
+        rendered = [(p, clip['target_dur']) for p, clip in zip(processed_clips, clip_data) if p]
+        processed_clips = [p for p, _ in rendered]
+
+        # 2. Transitions: only the clip edges at each boundary are re-encoded
+        if transition in XFADE_TRANSITIONS and not get_capabilities().has_filter("xfade"):
+            print(f"DEBUG: This ffmpeg has no xfade filter; '{transition}' rendered as hard cuts")
+        elif transition in FADE_TRANSITIONS or transition in XFADE_TRANSITIONS:
+            step(total + 1, total + 2, "Rendering transitions...")
+            processed_clips = apply_transitions(processed_clips, [d for _, d in rendered], transition, temp_dir,
+                                                workers, on_progress, cancel_event)
+            check_cancel()
+
+        # 3. Concat
+        step(total + 1, total + 2, "Concatenating...")
+        concat_list_path = os.path.join(temp_dir, "list.txt")
+        with open(concat_list_path, "w", encoding='utf-8') as f:
+            for p in processed_clips:
+                # Escape paths for FFmpeg concat file (forward slashes + quoting)
+                p_safe = p.replace("\\", "/").replace("'", "'\\''")
+                f.write(f"file '{p_safe}'\n")
+
+        temp_assembly = os.path.join(temp_dir, "temp_full.mp4")
+
+        cmd_concat = [
+            "ffmpeg", "-f", "concat", "-safe", "0",
+            "-i", concat_list_path,
+            "-c", "copy", "-y", temp_assembly
+        ]
+        returncode, err_tail = run_ffmpeg(cmd_concat, total_dur, on_progress, cancel_event=cancel_event)
+        check_cancel()
+        if returncode != 0:
+            raise RuntimeError(err_tail)
+
+        # 4. Audio Mixing (Optional)
+        final_target = output_path
+        final_mix_output = temp_assembly # Default if mixing fails or not needed
+
+        if settings.get("enabled"):
+            step(total + 2, total + 2, "Mixing Audio...")
+
+            original_vid = settings.get("original_path")
+            gen_vol = settings.get("generated_vol", 0.25)
+
+            if original_vid and os.path.exists(original_vid):
+                # Check if generated video has audio stream
+                has_gen_audio = has_audio_stream(temp_assembly)
+
+                mix_temp = os.path.join(temp_dir, "mixed_temp.mp4")
+
+                if has_gen_audio:
+                    # Mix Both: [0:a]volume={gen_vol}[a0];[1:a]volume=1.0[a1];[a0][a1]amix...
+                    filter_complex = f"[0:a]volume={gen_vol:.2f}[a0];[1:a]volume=1.0[a1];[a0][a1]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]"
+                    cmd_mix = [
+                        "ffmpeg", "-i", temp_assembly, "-i", original_vid,
+                        "-filter_complex", filter_complex,
+                        "-map", "0:v:0", "-map", "[aout]",
+                        "-c:v", "copy", "-c:a", "aac", "-b:a", "192k",
+                        "-shortest", "-y", mix_temp
+                    ]
+                else:
+                    # No generated audio: Pass original audio through (100% vol)
+                    # We just map video from 0 and audio from 1
+                    cmd_mix = [
+                        "ffmpeg", "-i", temp_assembly, "-i", original_vid,
+                        "-map", "0:v:0", "-map", "1:a:0",
+                        "-c:v", "copy", "-c:a", "copy",
+                        "-shortest", "-y", mix_temp
+                    ]
+
+                run_ffmpeg(cmd_mix, total_dur, on_progress, cancel_event=cancel_event)
+                check_cancel()
+
+                if os.path.exists(mix_temp):
+                    final_mix_output = mix_temp
+                else:
+                    print("DEBUG: Mix failed, using temp_assembly")
+
+        # 5. Audio Normalization (Optional; skipped if this ffmpeg lacks loudnorm)
+        if settings.get("audio_norm") and get_capabilities().has_filter("loudnorm"):
+            step(total + 2, total + 2, "Normalizing Audio (Loudnorm)...")
+            # loudnorm=I=-16:TP=-1.5:LRA=11
+
+            norm_temp = os.path.join(temp_dir, "normalized.mp4")
+
+            cmd_norm = [
+                "ffmpeg", "-i", final_mix_output,
+                "-af", "loudnorm=I=-16:TP=-1.5:LRA=11",
+                "-c:v", "copy",
+                "-c:a", "aac", "-b:a", "192k",
+                "-y", norm_temp
+            ]
+            run_ffmpeg(cmd_norm, total_dur, on_progress, cancel_event=cancel_event)
+            check_cancel()
+
+            if os.path.exists(norm_temp):
+                shutil.move(norm_temp, final_target)
+            else:
+                # Fallback to mix output if norm failed
+                shutil.move(final_mix_output, final_target)
+        else:
+            # No normalization: Just move mixed output
+            shutil.move(final_mix_output, final_target)
+    finally:
+        _unpin_chunks(pinned)
+
+    # Trim the chunk cache only after concat has read this render's chunks
+    if chunk_cache:
+        chunk_cache.evict(keep=_pinned_chunk_paths())
+
+    return final_target
+
+
+def match_videos_to_rows(paths, row_count):
+    """
+    Batch assignment rule: the first number in a file name is the 1-based row
+    (frame 1 -> video 01). Returns ([(row, path), ...] sorted by number, [skipped names]).
+    """
+    parsed_files = []
+    skipped = []
+    for p in paths:
+        fname = os.path.basename(p)
+        match = re.search(r"(\d+)", fname)
+        if match:
+            parsed_files.append((int(match.group(1)), p))
+        else:
+            skipped.append(fname)
+
+    # Sort by number
+    parsed_files.sort(key=lambda x: x[0])
+    assignments = [(num - 1, p) for num, p in parsed_files if 0 <= num - 1 < row_count]
+    return assignments, skipped
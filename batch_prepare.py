@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from media_probe import get_probe_cache
+from cache_utils import get_cache_dir, file_identity, make_cache_key
+from prepare import PROCESSED_SUFFIX, prepared_output_path, trimmed_duration, run_prepare, default_encode_threads
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv")
+
+DONE = "done"
+SKIPPED = "skipped"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Settings shared by every file of a batch (same keys as the CLI job options)
+PREPARE_OPTION_DEFAULTS = {
+    "logo": None, "x": "0", "y": "0", "logo_width": None, "speed": None,
+    "trim": None, "stream_copy": True, "accurate_trim": False,
+}
+
+
+def default_batch_workers():
+    """ Files prepared at once: encodes are CPU bound, so at most half the cores (2-4) """
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+def list_source_videos(paths):
+    """ Folders (not recursive) and files -> source videos, skipping earlier *_processed outputs """
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            videos.extend(os.path.join(path, f) for f in sorted(os.listdir(path)) if f.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return [os.path.abspath(v) for v in videos if not os.path.splitext(v)[0].endswith(PROCESSED_SUFFIX)]
+
+
+def prepare_fingerprint(video_path, options):
+    """ Key of everything the output depends on: source + logo identity and the settings """
+    logo = options.get("logo")
+    return make_cache_key(
+        file_identity(video_path),
+        file_identity(logo) if logo and os.path.exists(logo) else None,
+        {k: options.get(k, v) for k, v in PREPARE_OPTION_DEFAULTS.items() if k != "logo"}
+    )
+
+
+class PrepareManifest:
+    """
+    Which outputs are up to date: output path -> fingerprint it was made from plus
+    the output's own identity (so an edited or replaced output is redone).
+    JSON in the cache folder, rewritten atomically after every finished file.
+    """
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_cache_dir("prepare"), "manifest.json")
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_current(self, output_path, fingerprint):
+        entry = self.entries.get(os.path.abspath(output_path))
+        if not entry or entry.get("key") != fingerprint or not os.path.exists(output_path):
+            return False
+        return entry.get("output") == file_identity(output_path)
+
+    def record(self, output_path, fingerprint):
+        with self._lock:
+            self.entries[os.path.abspath(output_path)] = {"key": fingerprint, "output": file_identity(output_path)}
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self.entries, f)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+
+
+def batch_prepare(videos, options, max_workers=None, on_progress=None, on_file_done=None, cancel_event=None,
+                  manifest=None):
+    """
+    run_prepare for every video with the same options, max_workers files at a time.
+    Encoder threads are split between the concurrent files. Outputs already made
+    from the same source and settings are skipped.
+    on_progress(i, percent, fps, speed) and on_file_done(i, result) fire from pool threads.
+    Returns one result dict per video, in order.
+    """
+    options = {**PREPARE_OPTION_DEFAULTS, **options}
+    workers = max(1, min(max_workers or default_batch_workers(), len(videos) or 1))
+    threads = default_encode_threads(workers)
+    manifest = manifest or PrepareManifest()
+    probe = get_probe_cache()
+
+    def prepare_one(i, video):
+        output = prepared_output_path(video)
+        result = {"video": video, "output": output, "status": FAILED, "seconds": 0.0,
+                  "media_seconds": 0.0, "bytes": 0, "error": ""}
+        started = False
+        try:
+            if cancel_event is not None and cancel_event.is_set():
+                result["status"] = CANCELLED
+            else:
+                key = prepare_fingerprint(video, options)
+                if manifest.is_current(output, key):
+                    result["status"] = SKIPPED
+                else:
+                    duration = probe.get_duration(video)
+                    out_dur = trimmed_duration(duration, options["trim"]) if options["trim"] is not None else duration
+                    def progress(percent, fps, speed):
+                        if on_progress: on_progress(i, percent, fps, speed)
+                    start = time.perf_counter()
+                    started = True
+                    run_prepare(video, output, options["logo"], options["x"], options["y"], options["trim"], duration,
+                                progress, options["stream_copy"], options["accurate_trim"], cancel_event,
+                                logo_width=options["logo_width"], target_speed=options["speed"], threads=threads)
+                    result.update(status=DONE, seconds=time.perf_counter() - start, media_seconds=out_dur,
+                                  bytes=os.path.getsize(output))
+                    manifest.record(output, key)
+        except Exception as e:
+            result["status"] = CANCELLED if cancel_event is not None and cancel_event.is_set() else FAILED
+            result["error"] = str(e).strip().splitlines()[-1] if str(e).strip() else type(e).__name__
+            if started and os.path.exists(output):
+                # Half-written output: remove it so nobody mistakes it for a result
+                try: os.remove(output)
+                except OSError: pass
+        if on_file_done:
+            on_file_done(i, result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(prepare_one, range(len(videos)), videos))
+
+
+def summarize_batch(results, wall_seconds):
+    """ Counts per status plus throughput of the files actually processed """
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in (DONE, SKIPPED, FAILED, CANCELLED)}
+    done = [r for r in results if r["status"] == DONE]
+    media = sum(r["media_seconds"] for r in done)
+    size = sum(r["bytes"] for r in done)
+    wall = max(wall_seconds, 1e-6)
+    return {
+        "files": len(results), **counts,
+        "wall_seconds": wall_seconds, "media_seconds": media, "output_bytes": size,
+        "realtime_factor": media / wall, # Seconds of video prepared per wall-clock second
+        "output_mb_per_s": size / wall / 1e6,
+        "files_per_min": len(done) * 60.0 / wall,
+    }
+
+
+def format_batch_summary(summary):
+    return (f"{summary[DONE]} prepared, {summary[SKIPPED]} up to date, {summary[FAILED]} failed, "
+            f"{summary[CANCELLED]} cancelled in {summary['wall_seconds']:.1f}s "
+            f"({summary['realtime_factor']:.1f}x realtime, {summary['output_mb_per_s']:.1f} MB/s)")
+
+
+def write_batch_report(results, wall_seconds, report_dir, options):
+    """ Plain-text report (settings, summary, one line per file); returns its path """
+    summary = summarize_batch(results, wall_seconds)
+    options = {**PREPARE_OPTION_DEFAULTS, **options}
+    path = os.path.join(report_dir, f"prepare_report_{datetime.now():%Y%m%d-%H%M%S}.txt")
+    lines = [
+        f"Batch prepare report - {datetime.now():%Y-%m-%d %H:%M:%S}",
+        "Settings: " + ", ".join(f"{k}={options[k]}" for k in PREPARE_OPTION_DEFAULTS),
+        format_batch_summary(summary),
+        f"Throughput: {summary['media_seconds']:.1f}s of video in {summary['wall_seconds']:.1f}s wall, "
+        f"{summary['files_per_min']:.1f} files/min",
+        "",
+        f"{'status':<10}{'time':>9}{'speed':>9}{'size MB':>10}  file",
+    ]
+    for r in results:
+        speed = f"{r['media_seconds'] / r['seconds']:.1f}x" if r["seconds"] > 0 else "-"
+        lines.append(f"{r['status']:<10}{r['seconds']:>8.1f}s{speed:>9}{r['bytes'] / 1e6:>10.1f}  {r['video']}")
+        if r["error"]:
+            lines.append(f"{'':<10}error: {r['error']}")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import shutil
+import uuid
+import hashlib
+
+APP_CACHE_NAME = "VideoToolsSuite"
+
+
+def get_cache_dir(name):
+    """ Per-user cache folder (created on demand). VIDEO_TOOLS_CACHE overrides the base """
+    base = os.environ.get("VIDEO_TOOLS_CACHE")
+    if not base:
+        if os.name == 'nt':
+            base = os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), APP_CACHE_NAME)
+        elif sys.platform == "darwin":
+            base = os.path.join(os.path.expanduser("~/Library/Caches"), APP_CACHE_NAME)
+        else:
+            base = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), APP_CACHE_NAME)
+    path = os.path.join(base, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_identity(path):
+    """ (abs path, size, mtime) - cheap stand-in for hashing the file contents """
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+def make_cache_key(*parts):
+    """ Stable hex key for any JSON-serialisable parts """
+    blob = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class DiskLRUCache:
+    """
+    Flat folder of <key><suffix> files bounded by total size.
+    Recency is the file mtime (touched on every hit), so the LRU order
+    survives restarts without a separate index.
+    """
+    def __init__(self, directory, max_bytes, suffix=""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def get(self, key):
+        path = self.path_for(key)
+        if not os.path.isfile(path):
+            return None
+        try: os.utime(path, None)
+        except OSError: pass
+        return path
+
+    def put(self, key, src_path):
+        """ Moves src_path into the cache and returns its cached location """
+        path = self.path_for(key)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        shutil.move(src_path, tmp)
+        os.replace(tmp, path) # Atomic, so concurrent readers never see a partial file
+        return path
+
+    def get_bytes(self, key):
+        path = self.get(key)
+        if not path: return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put_bytes(self, key, data):
+        path = self.path_for(key)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path
+
+    def evict(self, keep=()):
+        """
+        Deletes least recently used entries until the folder fits max_bytes.
+        Paths in keep (still in use elsewhere) count towards the size but stay.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not os.path.isfile(path): continue
+            total += st.st_size
+            if path not in keep:
+                entries.append((st.st_mtime, st.st_size, path))
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes: break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        return total
@@ -0,0 +1,302 @@
+"""
+Headless prepare -> extract -> assemble pipeline (no PyQt needed).
+
+  python cli.py talk.mp4 --logo logo.png --x 10 --y 10 --extract fast --videos clips/
+  python cli.py --spec jobs.json --jobs 2
+  python cli.py --prepare-only lectures/ --logo logo.png --trim 3 --jobs 3
+
+jobs.json: {"defaults": {...}, "jobs": [{"video": "talk.mp4", ...}, ...]}
+Job keys mirror the long options (logo, x, y, logo_width, speed, trim, stream_copy, accurate_trim, extract, dedup, videos,
+output, transition, zoom, auto_zoom, mix, generated_vol, audio_norm, engine,
+chunk_workers, chunk_cache); "videos" is a folder or a list of files.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from media_probe import get_probe_cache
+from ffmpeg_caps import get_capabilities
+from prepare import run_prepare, default_encode_threads
+from extraction import EXTRACT_MODES, extract_slides, list_slide_files, slide_timeline
+from slide_dedup import dedupe_slides
+from assembly import TRANSITIONS, assemble_video, match_videos_to_rows, default_chunk_workers
+from batch_prepare import (DONE, VIDEO_EXTENSIONS, list_source_videos, batch_prepare, default_batch_workers,
+                           format_batch_summary, summarize_batch, write_batch_report)
+
+JOB_DEFAULTS = {
+    "logo": None, "x": "0", "y": "0", "logo_width": None, "speed": None, "trim": None, "stream_copy": True, "accurate_trim": False,
+    "extract": "full", "dedup": False, "slides_dir": None,
+    "videos": None, "output": None,
+    "transition": "None", "zoom": 110, "auto_zoom": False,
+    "mix": False, "generated_vol": 0.10, "audio_norm": False,
+    "engine": "chunked", "chunk_workers": None, "chunk_cache": True,
+}
+
+_print_lock = threading.Lock()
+
+def log(label, msg):
+    with _print_lock:
+        print(f"[{label}] {msg}", flush=True)
+
+
+def list_videos(source):
+    """
+    'videos' job value (folder or list of paths) -> list of video paths.
+    Unlike list_source_videos, *_processed files are kept: they are what gets assembled.
+    """
+    if not source:
+        return []
+    if isinstance(source, str):
+        if os.path.isdir(source):
+            return [os.path.join(source, f) for f in sorted(os.listdir(source)) if f.lower().endswith(VIDEO_EXTENSIONS)]
+        return [source]
+    return list(source)
+
+
+def build_clip_data(slides_dir, video_paths, auto_zoom):
+    """ Same rows as the Assembly tab: one per slide, videos matched by the number in their name """
+    files = list_slide_files(slides_dir)
+    if not files:
+        raise RuntimeError(f"No frames found in {slides_dir}")
+    assigned = dict(match_videos_to_rows(video_paths, len(files))[0])
+    probe = get_probe_cache()
+
+    clip_data = []
+    for r, (f_name, (_, target)) in enumerate(zip(files, slide_timeline(files))):
+        video = assigned.get(r)
+        if not video and not auto_zoom:
+            raise RuntimeError(f"Row {r+1} has no video assigned and Auto-Zoom is unavailable.")
+        source = probe.get_duration(video) if video else 0.0
+        clip_data.append({
+            "video": video,
+            "image": os.path.join(slides_dir, f_name),
+            "target_dur": float(target),
+            "source_dur": float(source or target)
+        })
+    return clip_data
+
+
+def run_job(job, label, chunk_workers, encode_threads=None):
+    """ Runs one job dict (JOB_DEFAULTS keys + 'video'); returns the last output path """
+    video = os.path.abspath(job["video"])
+    base = os.path.splitext(video)[0]
+    probe = get_probe_cache()
+
+    last_pct = [-1]
+    def on_progress(percent, fps, speed):
+        # One line per 10%: readable when several jobs share a terminal
+        step = int(percent // 10)
+        if step != last_pct[0]:
+            last_pct[0] = step
+            log(label, f"  {percent:5.1f}%  {fps:.0f} fps  {speed:.2f}x")
+
+    # 1. Prepare (watermark / trim)
+    if job["logo"] or job["trim"] is not None:
+        log(label, "Processing...")
+        last_pct[0] = -1
+        video = run_prepare(video, None, job["logo"], job["x"], job["y"], job["trim"],
+                            probe.get_duration(video), on_progress, job["stream_copy"], job["accurate_trim"],
+                            logo_width=job["logo_width"], target_speed=job["speed"], threads=encode_threads)
+        log(label, f"Prepared {video}")
+    result = video
+
+    # 2. Extract slides
+    slides_dir = job["slides_dir"] or f"{base}_slides"
+    if job["extract"]:
+        os.makedirs(slides_dir, exist_ok=True)
+        log(label, f"Extracting ({job['extract']})...")
+        last_pct[0] = -1
+        written = extract_slides(video, slides_dir, job["extract"], probe.get_duration(video), on_progress)
+        log(label, f"Extracted {len(written)} slides into {slides_dir}")
+        if job["dedup"]:
+            kept, removed = dedupe_slides(slides_dir)
+            log(label, f"Merged {removed} near-duplicate slides ({kept} kept)")
+        result = slides_dir
+
+    # 3. Assemble
+    video_paths = list_videos(job["videos"])
+    if video_paths or job["auto_zoom"]:
+        clip_data = build_clip_data(slides_dir, video_paths, job["auto_zoom"])
+        output = job["output"] or f"{base}_final.mp4"
+        settings = {
+            "enabled": bool(job["mix"]),
+            "original_path": video,
+            "generated_vol": float(job["generated_vol"]),
+            "zoom_amount": int(job["zoom"]),
+            "audio_norm": bool(job["audio_norm"]),
+            "transition": job["transition"],
+            "chunk_workers": job["chunk_workers"] or chunk_workers,
+            "use_chunk_cache": bool(job["chunk_cache"]),
+            "engine": job["engine"]
+        }
+        def on_step(current, total, msg):
+            last_pct[0] = -1
+            log(label, msg)
+        # Per-job temp dir: concurrent jobs writing next to each other must not share one
+        result = assemble_video(clip_data, output, settings, f"{base}_temp_assembly", on_step, on_progress)
+        log(label, f"Saved {result}")
+    return result
+
+
+def load_jobs(args):
+    """ CLI args or a --spec file -> list of complete job dicts """
+    if args.spec:
+        with open(args.spec, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        defaults = {**JOB_DEFAULTS, **spec.get("defaults", {})}
+        jobs = [{**defaults, **job} for job in spec.get("jobs", [])]
+        # Relative paths in a spec are relative to the spec file
+        spec_dir = os.path.dirname(os.path.abspath(args.spec))
+        for job in jobs:
+            for key in ("video", "logo", "output", "slides_dir"):
+                if job.get(key):
+                    job[key] = os.path.join(spec_dir, job[key])
+            if isinstance(job.get("videos"), str):
+                job["videos"] = os.path.join(spec_dir, job["videos"])
+            elif job.get("videos"):
+                job["videos"] = [os.path.join(spec_dir, p) for p in job["videos"]]
+    else:
+        overrides = {
+            "logo": args.logo, "x": args.x, "y": args.y, "logo_width": args.logo_width, "speed": args.speed,
+            "trim": args.trim,
+            "stream_copy": not args.reencode, "accurate_trim": args.accurate_trim,
+            "extract": None if args.extract == "none" else args.extract, "dedup": args.dedup,
+            "videos": args.videos[0] if args.videos and len(args.videos) == 1 else args.videos,
+            "transition": args.transition, "zoom": args.zoom, "auto_zoom": args.auto_zoom,
+            "mix": args.mix, "generated_vol": args.generated_vol / 100.0, "audio_norm": args.audio_norm,
+            "engine": args.engine, "chunk_workers": args.chunk_workers, "chunk_cache": not args.no_chunk_cache,
+        }
+        jobs = [{**JOB_DEFAULTS, **overrides, "video": v} for v in args.inputs]
+        if args.output and len(jobs) == 1:
+            jobs[0]["output"] = args.output
+
+    for job in jobs:
+        if not job.get("video"):
+            raise ValueError("Every job needs a 'video'.")
+        if job["extract"] and job["extract"] not in EXTRACT_MODES:
+            raise ValueError(f"Unknown extract mode: {job['extract']}")
+        if job["transition"] not in TRANSITIONS:
+            raise ValueError(f"Unknown transition: {job['transition']}")
+    return jobs
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Video Tools Suite - headless pipeline")
+    p.add_argument("inputs", nargs="*", help="Input videos (one job each)")
+    p.add_argument("--spec", help="JSON job spec (overrides the per-job options below)")
+    p.add_argument("--jobs", type=int, help="Jobs run concurrently (default 1; --prepare-only: a few per machine)")
+    p.add_argument("--prepare-only", action="store_true",
+                   help="Only watermark/trim the inputs (files or folders); up-to-date outputs are skipped")
+    p.add_argument("--report-dir", help="--prepare-only report folder (default: the first input's folder)")
+
+    g = p.add_argument_group("prepare")
+    g.add_argument("--logo", help="Watermark image")
+    g.add_argument("--x", default="0", help="Watermark X (ffmpeg overlay expression)")
+    g.add_argument("--y", default="0", help="Watermark Y (ffmpeg overlay expression)")
+    g.add_argument("--logo-width", type=int, help="Pre-scale the logo to this width in px (cached)")
+    g.add_argument("--speed", type=float, help="Watermark encode target, x realtime (picks preset/CRF)")
+    g.add_argument("--trim", type=float, help="Seconds to cut off the end")
+    g.add_argument("--reencode", action="store_true", help="Re-encode a trim even without a logo (default: stream copy)")
+    g.add_argument("--accurate-trim", action="store_true", help="Frame-accurate cut: re-encodes only the GOP at the cut")
+
+    g = p.add_argument_group("extract")
+    g.add_argument("--extract", choices=EXTRACT_MODES + ("none",), default="full")
+    g.add_argument("--dedup", action="store_true", help="Merge near-duplicate slides")
+
+    g = p.add_argument_group("assemble")
+    g.add_argument("--videos", nargs="+", help="Clip folder or files (first number in the name = slide row)")
+    g.add_argument("--output", help="Final video (single input only)")
+    g.add_argument("--transition", choices=TRANSITIONS, default="None")
+    g.add_argument("--zoom", type=int, default=110, help="Auto-zoom amount in percent (100-200)")
+    g.add_argument("--auto-zoom", action="store_true", help="Ken Burns the slide image for rows without a video")
+    g.add_argument("--mix", action="store_true", help="Mix the source video's audio under the clips")
+    g.add_argument("--generated-vol", type=float, default=10, help="Clip audio volume in percent when mixing")
+    g.add_argument("--audio-norm", action="store_true", help="Loudness-normalise the result")
+    g.add_argument("--engine", choices=("chunked", "single_pass"), default="chunked")
+    g.add_argument("--chunk-workers", type=int, help="Parallel clip encodes per job")
+    g.add_argument("--no-chunk-cache", action="store_true")
+
+    args = p.parse_args(argv)
+    if not args.inputs and not args.spec:
+        p.error("give input videos or --spec")
+    if args.prepare_only and (args.spec or not args.inputs):
+        p.error("--prepare-only takes input videos or folders (no --spec)")
+    if not 100 <= args.zoom <= 200:
+        p.error("--zoom must be between 100 and 200")
+    return args
+
+
+def run_prepare_only(args):
+    """ --prepare-only: one batch over every input video, then a report """
+    videos = list_source_videos(args.inputs)
+    if not videos:
+        print("Error: no source videos found.", file=sys.stderr)
+        return 2
+    options = {
+        "logo": args.logo, "x": args.x, "y": args.y, "logo_width": args.logo_width, "speed": args.speed,
+        "trim": args.trim, "stream_copy": not args.reencode, "accurate_trim": args.accurate_trim,
+    }
+    labels = [f"{i+1}/{len(videos)} {os.path.basename(v)}" for i, v in enumerate(videos)]
+    last_pct = [-1] * len(videos)
+
+    def on_progress(i, percent, fps, speed):
+        step = int(percent // 10)
+        if step != last_pct[i]:
+            last_pct[i] = step
+            log(labels[i], f"  {percent:5.1f}%  {fps:.0f} fps  {speed:.2f}x")
+
+    def on_file_done(i, result):
+        detail = f" ({result['seconds']:.1f}s)" if result["status"] == DONE else ""
+        log(labels[i], f"{result['status'].upper()}{detail} {result['error']}".rstrip())
+
+    start = time.perf_counter()
+    results = batch_prepare(videos, options, args.jobs or default_batch_workers(), on_progress, on_file_done)
+    wall = time.perf_counter() - start
+
+    report_dir = args.report_dir or (args.inputs[0] if os.path.isdir(args.inputs[0]) else os.path.dirname(videos[0]))
+    report = write_batch_report(results, wall, report_dir, options)
+    summary = summarize_batch(results, wall)
+    print(format_batch_summary(summary))
+    print(f"Report: {report}")
+    return 1 if summary["failed"] else 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not get_capabilities().available:
+        print("Error: ffmpeg not found on PATH.", file=sys.stderr)
+        return 2
+    if args.prepare_only:
+        return run_prepare_only(args)
+    try:
+        jobs = load_jobs(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    n_jobs = max(1, min(args.jobs or 1, len(jobs)))
+    # Concurrent jobs share the CPU: split the chunk encoders between them
+    chunk_workers = max(1, default_chunk_workers() // n_jobs)
+    encode_threads = default_encode_threads(n_jobs)
+    labels = [f"{i+1}/{len(jobs)} {os.path.basename(job['video'])}" for i, job in enumerate(jobs)]
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        futures = [pool.submit(run_job, job, label, chunk_workers, encode_threads) for job, label in zip(jobs, labels)]
+        for future, label in zip(futures, labels):
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                log(label, f"FAILED: {e}")
+
+    print(f"{len(jobs) - failed}/{len(jobs)} jobs succeeded.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ffmpeg_utils import get_subprocess_kwargs, run_ffmpeg
+
+SCENE_THRESHOLD = 0.12
+# Fast mode analysis stream: scene scores barely change at this size/rate for slide decks
+ANALYSIS_WIDTH = 320
+ANALYSIS_FPS = 5
+
+# Segmented mode: each range re-decodes this much of the previous one for a correct boundary score
+SEGMENT_OVERLAP = 2.0
+DUPLICATE_TOLERANCE = 0.1 # Candidates closer than this (seconds) are the same change
+
+PTS_TIME_RE = re.compile(r'pts_time:([0-9\.]+)')
+SCENE_SCORE_RE = re.compile(r'lavfi\.scene_score=([0-9\.]+)')
+
+
+def format_timestamp(ts_float):
+    """ Seconds -> 'MM-SS-mmm' as used in frame file names """
+    minutes = int(ts_float // 60)
+    seconds = int(ts_float % 60)
+    millis = int((ts_float * 1000) % 1000)
+    return f"{minutes:02d}-{seconds:02d}-{millis:03d}"
+
+
+def slide_filename(index, ts_float):
+    """ 1-based index + timestamp -> 'frame_0001__01-23-456.png' """
+    return f"frame_{index:04d}__{format_timestamp(ts_float)}.png"
+
+
+class SceneMetadataParser:
+    """
+    Incremental parser for `metadata=print` stderr output. Each selected frame prints
+      [Parsed_metadata_1 @ ...] frame:3    pts:123   pts_time:12.3
+      [Parsed_metadata_1 @ ...] lavfi.scene_score=0.41
+    feed(line) returns a finished (pts_time, scene_score) record or None;
+    flush() returns the last pending record once the stream ends.
+    """
+    def __init__(self):
+        self.pending = None
+
+    def feed(self, line):
+        match = PTS_TIME_RE.search(line)
+        if match:
+            done = self.flush() # A frame without a score line is still a slide
+            self.pending = [float(match.group(1)), 0.0]
+            return done
+        match = SCENE_SCORE_RE.search(line)
+        if match and self.pending is not None:
+            self.pending[1] = float(match.group(1))
+            return self.flush()
+        return None
+
+    def flush(self):
+        record, self.pending = self.pending, None
+        return tuple(record) if record else None
+
+
+def build_scene_scan_command(video_path, width=ANALYSIS_WIDTH, fps=ANALYSIS_FPS, seek=0.0, length=None):
+    """ Scene-score pass (optionally downscaled/frame-skipped, optionally one time range); writes no images """
+    filters = []
+    if fps:
+        # Skip frames with select, not fps: fps snaps pts onto its grid, so a change
+        # could be reported before it happens and the grab would catch the old slide.
+        # The 1 ms slack stops float error from skipping a whole extra frame.
+        filters.append(f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{1.0 / fps - 0.001:.4f})'")
+    if width:
+        filters.append(f"scale={width}:-2")
+    filters.append(f"select='eq(n,0)+gt(scene,{SCENE_THRESHOLD})',metadata=print")
+
+    cmd = ["ffmpeg"]
+    if seek > 0:
+        cmd += ["-ss", f"{seek:.3f}"]
+    if length:
+        cmd += ["-t", f"{length:.3f}"]
+    return cmd + [
+        "-i", video_path,
+        "-vf", ",".join(filters),
+        "-an", "-f", "null", "-"
+    ]
+
+
+def _run_scene_scan(cmd, seek=0.0, keep_from=0.0, duration=0.0, on_progress=None):
+    """ Runs a scan command; returns absolute candidate timestamps >= keep_from """
+    timestamps = []
+    def on_line(line):
+        match = PTS_TIME_RE.search(line)
+        if match:
+            # Input -ss restarts output timestamps at 0
+            ts = seek + float(match.group(1))
+            if ts >= keep_from:
+                timestamps.append(ts)
+
+    returncode, err_tail = run_ffmpeg(cmd, duration, on_progress, on_line)
+    if returncode != 0:
+        raise RuntimeError(err_tail)
+    return timestamps
+
+
+def scan_scene_candidates(video_path, duration=0.0, on_progress=None, width=ANALYSIS_WIDTH, fps=ANALYSIS_FPS):
+    """ Stage 1: returns the candidate slide timestamps (seconds, ascending) """
+    timestamps = _run_scene_scan(build_scene_scan_command(video_path, width, fps), duration=duration, on_progress=on_progress)
+    return sorted(set(timestamps))
+
+
+def find_keyframe_cuts(video_path, duration, segments):
+    """
+    Splits [0, duration] into `segments` ranges whose boundaries sit on keyframes.
+    One ffprobe call: each read interval seeks to the keyframe at/before a nominal
+    cut and reads a single packet. Falls back to the nominal cuts on failure.
+    """
+    nominal = [duration * i / segments for i in range(1, segments)]
+    if not nominal:
+        return []
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-read_intervals", ",".join(f"{t:.3f}%+#1" for t in nominal),
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", video_path
+    ]
+    cuts = []
+    try:
+        res = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, **get_subprocess_kwargs())
+        for line in res.stdout.splitlines():
+            parts = line.strip().split(",")
+            if len(parts) >= 2 and "K" in parts[-1]:
+                try: cuts.append(float(parts[0]))
+                except ValueError: pass
+    except Exception:
+        pass
+    cuts = sorted(set(c for c in cuts if 0 < c < duration))
+    return cuts or nominal
+
+
+def merge_candidates(timestamps, tolerance=DUPLICATE_TOLERANCE):
+    """ Sorts and drops near-identical timestamps (same change seen by two segments) """
+    merged = []
+    for ts in sorted(timestamps):
+        if merged and ts - merged[-1] < tolerance:
+            continue
+        merged.append(ts)
+    return merged
+
+
+def default_segment_count():
+    return max(2, min(8, (os.cpu_count() or 2) // 2))
+
+
+def scan_scene_candidates_segmented(video_path, duration, segments=None, on_progress=None, width=None, fps=None):
+    """
+    Scene detection split into keyframe-aligned time ranges scanned in parallel.
+    Each range (after the first) starts decoding SEGMENT_OVERLAP seconds early so the
+    scene score at its boundary compares against the real previous frame; candidates
+    from the overlap (incl. that range's forced first frame) are dropped.
+    Defaults to full-resolution analysis so results match the Full Decode mode.
+    """
+    segments = segments or default_segment_count()
+    if duration <= 0 or segments < 2:
+        return scan_scene_candidates(video_path, duration, on_progress, width, fps)
+
+    bounds = [0.0] + find_keyframe_cuts(video_path, duration, segments) + [duration]
+    ranges = list(zip(bounds[:-1], bounds[1:]))
+    lengths = [end - start for start, end in ranges]
+    done_pct = [0.0] * len(ranges)
+    lock = threading.Lock()
+
+    def segment_progress(i):
+        def report(percent, fps_val, speed):
+            with lock:
+                done_pct[i] = percent
+                overall = sum(p * l for p, l in zip(done_pct, lengths)) / duration
+            on_progress(overall, fps_val, speed)
+        return report if on_progress else None
+
+    def scan_range(i, start, end):
+        seek = max(0.0, start - SEGMENT_OVERLAP) if start > 0 else 0.0
+        cmd = build_scene_scan_command(video_path, width, fps, seek=seek, length=end - seek)
+        return _run_scene_scan(cmd, seek=seek, keep_from=start, duration=end - seek, on_progress=segment_progress(i))
+
+    timestamps = []
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [pool.submit(scan_range, i, start, end) for i, (start, end) in enumerate(ranges)]
+        for future in futures:
+            timestamps.extend(future.result())
+    return merge_candidates(timestamps)
+
+
+def grab_frame(video_path, ts_float, out_path):
+    """ Full-resolution frame at ts (input -ss is frame-accurate: decodes from the prior keyframe) """
+    cmd = [
+        "ffmpeg", "-v", "error", "-ss", f"{ts_float:.3f}", "-i", video_path,
+        "-frames:v", "1", "-y", out_path
+    ]
+    res = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **get_subprocess_kwargs())
+    return res.returncode == 0 and os.path.exists(out_path)
+
+
+def grab_frames(video_path, timestamps, out_dir, max_workers=None, on_frame_done=None):
+    """
+    Stage 2: grabs each timestamp at full resolution as frame_NNNN__MM-SS-mmm.png.
+    on_frame_done(done, total) reports progress. Returns the written paths in order.
+    """
+    total = len(timestamps)
+    workers = max_workers or max(1, min(4, os.cpu_count() or 1))
+    out_paths = [os.path.join(out_dir, slide_filename(i + 1, ts)) for i, ts in enumerate(timestamps)]
+    written = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(grab_frame, video_path, ts, out) for ts, out in zip(timestamps, out_paths)]
+        for done, (future, out) in enumerate(zip(futures, out_paths), start=1):
+            if future.result():
+                written.append(out)
+            if on_frame_done:
+                on_frame_done(done, total)
+    return written
+
+
+def extract_slides_two_stage(video_path, out_dir, duration=0.0, on_progress=None):
+    """
+    Fast extraction: cheap scene scan on a small stream, then exact full-res grabs.
+    on_progress(percent, fps, speed): the scan is the first 80%, the grabs the rest.
+    """
+    def scan_progress(percent, fps, speed):
+        if on_progress: on_progress(percent * 0.8, fps, speed)
+    timestamps = scan_scene_candidates(video_path, duration, scan_progress)
+
+    def grab_progress(done, total):
+        if on_progress: on_progress(80.0 + 20.0 * done / max(1, total), 0.0, 0.0)
+    return grab_frames(video_path, timestamps, out_dir, on_frame_done=grab_progress)
+
+
+def extract_slides_segmented(video_path, out_dir, duration=0.0, on_progress=None, segments=None):
+    """ Segment-parallel scene detection, then exact full-res grabs (same naming as Full Decode) """
+    def scan_progress(percent, fps, speed):
+        if on_progress: on_progress(percent * 0.8, fps, speed)
+    timestamps = scan_scene_candidates_segmented(video_path, duration, segments, scan_progress)
+
+    def grab_progress(done, total):
+        if on_progress: on_progress(80.0 + 20.0 * done / max(1, total), 0.0, 0.0)
+    return grab_frames(video_path, timestamps, out_dir, on_frame_done=grab_progress)
+
+
+def extract_slides_full(video_path, out_dir, duration=0.0, on_progress=None, on_slide=None):
+    """
+    Full-resolution scene detection that writes slides as it goes.
+    stderr is parsed line by line; the k-th metadata record belongs to the k-th
+    image the muxer writes, so each slide_NNNN.png is renamed to its final
+    frame_NNNN__MM-SS-mmm.png (and reported via on_slide(path, pts_time, score))
+    as soon as the muxer has moved on to the next file.
+    """
+    # Stale intermediates from an older run would be mistaken for fresh output
+    for f in os.listdir(out_dir):
+        if f.startswith("slide_") and f.endswith(".png"):
+            try: os.remove(os.path.join(out_dir, f))
+            except OSError: pass
+
+    pattern = os.path.join(out_dir, "slide_%04d.png")
+    cmd = [
+        "ffmpeg", "-i", video_path,
+        "-vf", f"select='eq(n,0)+gt(scene,{SCENE_THRESHOLD})',metadata=print",
+        "-vsync", "vfr", pattern, "-y"
+    ]
+
+    parser = SceneMetadataParser()
+    records = [] # (pts_time, score) in output order
+    written = []
+    lock = threading.Lock()
+
+    published = [0]
+
+    def publish(final=False):
+        with lock:
+            while published[0] < len(records):
+                k = published[0] + 1 # 1-based image number
+                src = pattern % k
+                # The image2 muxer closes file k before it opens k+1
+                if not final and not os.path.exists(pattern % (k + 1)):
+                    break
+                published[0] += 1
+                if not os.path.exists(src):
+                    continue # Image never written; keep numbering aligned with records
+                ts, score = records[k - 1]
+                dst = os.path.join(out_dir, slide_filename(k, ts))
+                os.replace(src, dst)
+                written.append(dst)
+                if on_slide:
+                    on_slide(dst, ts, score)
+
+    def on_line(line):
+        record = parser.feed(line)
+        if record:
+            with lock:
+                records.append(record)
+            publish()
+
+    def progress(percent, fps, speed):
+        publish()
+        if on_progress: on_progress(percent, fps, speed)
+
+    returncode, err_tail = run_ffmpeg(cmd, duration, progress, on_line)
+    if returncode != 0:
+        raise RuntimeError(err_tail)
+    record = parser.flush()
+    if record:
+        records.append(record)
+    publish(final=True)
+    return written
+
+
+EXTRACT_MODES = ("full", "fast", "segments")
+
+def extract_slides(video_path, out_dir, mode="full", duration=0.0, on_progress=None, on_slide=None):
+    """ Dispatches to the extraction engine for mode; on_slide only fires in full mode """
+    if mode == "segments":
+        return extract_slides_segmented(video_path, out_dir, duration, on_progress)
+    if mode == "fast":
+        return extract_slides_two_stage(video_path, out_dir, duration, on_progress)
+    return extract_slides_full(video_path, out_dir, duration, on_progress, on_slide)
+
+
+def list_slide_files(directory):
+    """ Sorted frame_*.png / slide_*.png names in directory """
+    return sorted(f for f in os.listdir(directory) if (f.startswith("frame_") or f.startswith("slide_")) and f.lower().endswith(".png"))
+
+
+def parse_filename_timestamp(fname):
+    """ 'frame_0001__01-23-456.png' -> 83.456 seconds, or -1.0 without a timestamp """
+    try:
+        if "__" in fname:
+            part = fname.split("__")[1].split(".")[0] # 01-23-456
+            mins, secs, mills = map(int, part.split("-"))
+            return (mins * 60) + secs + (mills / 1000.0)
+    except ValueError:
+        pass
+    return -1.0
+
+
+def slide_timeline(files):
+    """
+    Per-slide (timestamp, target duration) for the assembly table.
+    Missing timestamps are estimated as previous + 5s; a slide lasts until the
+    next one (min 1s), or 5s when the next time is unknown / for the last slide.
+    """
+    t_stamps = [parse_filename_timestamp(f) for f in files]
+    timeline = []
+    for r in range(len(files)):
+        ts_val = t_stamps[r]
+        if ts_val < 0:
+            # If timestamp is missing (-1.0), estimate it!
+            if r == 0:
+                ts_val = 0.0
+            else:
+                # Use previous timestamp + 5.0 seconds
+                prev = t_stamps[r-1]
+                if prev < 0: prev = 0.0 # safety
+                ts_val = prev + 5.0
+            # Update t_stamps array for future iterations
+            t_stamps[r] = ts_val
+
+        if r < len(files) - 1:
+            next_raw = t_stamps[r+1]
+            if next_raw < 0:
+                # Next one is invalid, so just assume 5.0s diff
+                dur = 5.0
+            else:
+                dur = max(1.0, next_raw - ts_val)
+        else:
+            dur = 5.0 # Last slide default
+        timeline.append((ts_val, dur))
+    return timeline
@@ -0,0 +1,151 @@
+import os
+import re
+import json
+import shutil
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from ffmpeg_utils import get_subprocess_kwargs
+from cache_utils import get_cache_dir, file_identity, make_cache_key
+
+# libx264 preferred for output parity; first available hardware encoder as fallback
+H264_ENCODERS = ("libx264", "h264_videotoolbox", "h264_nvenc", "h264_qsv", "h264_amf", "libopenh264")
+FLAG_RE = re.compile(r"^[A-Z.|]{3,6}$")
+
+
+def _run(cmd):
+    try:
+        res = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                             text=True, encoding="utf-8", errors="replace", timeout=30, **get_subprocess_kwargs())
+        return res.stdout if res.returncode == 0 else ""
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+
+
+def parse_version(output):
+    """ 'ffmpeg version 6.1.1 Copyright ...' -> '6.1.1' """
+    first = output.splitlines()[0] if output else ""
+    parts = first.split()
+    return parts[2] if len(parts) > 2 and parts[1] == "version" else ""
+
+
+def parse_listing(output):
+    """
+    Names from `-encoders` / `-filters` listings: rows are '<flags> <name> ...'.
+    Legend rows ('V..... = Video') and the ' ------' separator are skipped.
+    """
+    names = set()
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and FLAG_RE.match(parts[0]) and parts[1] != "=":
+            names.add(parts[1])
+    return names
+
+
+class FFmpegCapabilities:
+    """ What the installed ffmpeg/ffprobe can do. Empty listings mean "unknown": checks then pass """
+    def __init__(self, ffmpeg_path=None, ffprobe_path=None, version="", encoders=(), filters=()):
+        self.ffmpeg_path = ffmpeg_path
+        self.ffprobe_path = ffprobe_path
+        self.version = version
+        self.encoders = set(encoders)
+        self.filters = set(filters)
+
+    @property
+    def available(self):
+        return bool(self.ffmpeg_path)
+
+    def has_encoder(self, name):
+        return not self.encoders or name in self.encoders
+
+    def has_filter(self, name):
+        return not self.filters or name in self.filters
+
+    def h264_encoder(self):
+        for name in H264_ENCODERS:
+            if name in self.encoders:
+                return name
+        return "libx264"
+
+    def to_dict(self):
+        return {"ffmpeg_path": self.ffmpeg_path, "ffprobe_path": self.ffprobe_path, "version": self.version,
+                "encoders": sorted(self.encoders), "filters": sorted(self.filters)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("ffmpeg_path"), data.get("ffprobe_path"), data.get("version", ""),
+                   data.get("encoders", ()), data.get("filters", ()))
+
+
+def probe_capabilities(ffmpeg="ffmpeg", ffprobe="ffprobe", cache_path=None):
+    """
+    Runs -version / -encoders / -filters and ffprobe -version (concurrently) once per
+    binary: results are cached by the binaries' path, size and mtime.
+    """
+    ffmpeg_path = shutil.which(ffmpeg)
+    ffprobe_path = shutil.which(ffprobe)
+    if not ffmpeg_path:
+        return FFmpegCapabilities(None, ffprobe_path)
+
+    cache_path = cache_path or os.path.join(get_cache_dir("caps"), "ffmpeg_caps.json")
+    key = make_cache_key(file_identity(ffmpeg_path), file_identity(ffprobe_path) if ffprobe_path else None)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+    if key in cached:
+        return FFmpegCapabilities.from_dict(cached[key])
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        version, encoders, filters, _ = pool.map(_run, [
+            [ffmpeg_path, "-hide_banner", "-version"],
+            [ffmpeg_path, "-hide_banner", "-encoders"],
+            [ffmpeg_path, "-hide_banner", "-filters"],
+            [ffprobe_path or ffprobe, "-hide_banner", "-version"],
+        ])
+    caps = FFmpegCapabilities(ffmpeg_path, ffprobe_path, parse_version(version), parse_listing(encoders), parse_listing(filters))
+
+    if version: # Don't pin a failed probe
+        cached[key] = caps.to_dict()
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cached, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return caps
+
+
+_caps = None
+_caps_ready = threading.Event()
+_caps_lock = threading.Lock()
+_caps_thread = None
+
+def _probe_shared():
+    global _caps
+    try:
+        _caps = probe_capabilities()
+    except Exception:
+        _caps = FFmpegCapabilities(shutil.which("ffmpeg"), shutil.which("ffprobe"))
+    _caps_ready.set()
+
+
+def start_capability_probe(on_ready=None):
+    """ Starts the shared probe in the background (once per process); on_ready(caps) runs off the caller's thread """
+    global _caps_thread
+    with _caps_lock:
+        if _caps_thread is None:
+            _caps_thread = threading.Thread(target=_probe_shared, daemon=True)
+            _caps_thread.start()
+    if on_ready:
+        threading.Thread(target=lambda: on_ready(get_capabilities()), daemon=True).start()
+
+
+def get_capabilities():
+    """ Shared capabilities; waits for the background probe (starting it if needed) """
+    start_capability_probe()
+    _caps_ready.wait()
+    return _caps
@@ -0,0 +1,121 @@
+import os
+import subprocess
+import threading
+from collections import deque, namedtuple
+
+# An ffmpeg command whose input is generated in Python: stdin_chunks (bytes) are written to its stdin
+PipedCommand = namedtuple("PipedCommand", "argv stdin_chunks")
+
+
+def get_subprocess_kwargs():
+    """ Returns platform-specific kwargs to hide console window on Windows """
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = 0x08000000 # CREATE_NO_WINDOW
+    return kwargs
+
+
+def with_progress_pipe(cmd):
+    """ Inserts '-progress pipe:1 -nostats' as global options of an ffmpeg command """
+    cmd = list(cmd)
+    if cmd and os.path.basename(cmd[0]).lower().startswith("ffmpeg") and "-progress" not in cmd:
+        cmd[1:1] = ["-progress", "pipe:1", "-nostats"]
+    return cmd
+
+
+def _to_float(value, suffix=""):
+    try:
+        return float(value.strip().rstrip(suffix))
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def progress_from_block(block, duration):
+    """
+    Converts one -progress key=value block into (percent, fps, speed).
+    out_time_us/out_time_ms are both microseconds (the _ms name is historical).
+    """
+    out_us = _to_float(block.get("out_time_us") or block.get("out_time_ms"))
+    if block.get("progress") == "end":
+        percent = 100.0
+    elif duration and duration > 0:
+        percent = max(0.0, min(100.0, out_us / 1e6 / duration * 100.0))
+    else:
+        percent = 0.0
+    return percent, _to_float(block.get("fps")), _to_float(block.get("speed"), "x")
+
+
+def run_ffmpeg(cmd, duration=0.0, on_progress=None, on_stderr_line=None, stderr_tail=50, cancel_event=None,
+               stdin_chunks=None):
+    """
+    Runs an ffmpeg command, streaming its -progress output.
+    on_progress(percent, fps, speed) fires once per progress block (~2x/sec).
+    on_stderr_line(line) sees every stderr line as it is written.
+    Setting cancel_event (a threading.Event) terminates the process.
+    stdin_chunks (iterable of bytes, e.g. raw frames) is fed to ffmpeg's stdin on
+    its own thread; an exception while generating it fails the run.
+    Returns (returncode, last stderr lines joined) - stderr is never fully buffered.
+    """
+    proc = subprocess.Popen(
+        with_progress_pipe(cmd),
+        stdin=subprocess.DEVNULL if stdin_chunks is None else subprocess.PIPE,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, encoding="utf-8", errors="replace", bufsize=1,
+        **get_subprocess_kwargs()
+    )
+
+    # Drain stderr on its own thread so a chatty encoder can't block on a full pipe
+    tail = deque(maxlen=stderr_tail)
+    def drain_stderr():
+        for line in proc.stderr:
+            line = line.rstrip("\r\n")
+            tail.append(line)
+            if on_stderr_line:
+                on_stderr_line(line)
+    reader = threading.Thread(target=drain_stderr, daemon=True)
+    reader.start()
+
+    feed_error = []
+    feeder = None
+    if stdin_chunks is not None:
+        def feed_stdin():
+            try:
+                for data in stdin_chunks:
+                    proc.stdin.buffer.write(data)
+            except OSError:
+                pass # ffmpeg exited early (error or cancel): its return code says why
+            except Exception as e:
+                feed_error.append(f"Input generation failed: {e}")
+            finally:
+                try: proc.stdin.close()
+                except OSError: pass
+        feeder = threading.Thread(target=feed_stdin, daemon=True)
+        feeder.start()
+
+    if cancel_event is not None:
+        def watch_cancel():
+            while proc.poll() is None:
+                if cancel_event.wait(0.25):
+                    proc.terminate()
+                    return
+        threading.Thread(target=watch_cancel, daemon=True).start()
+
+    block = {}
+    for line in proc.stdout:
+        key, _, value = line.strip().partition("=")
+        if not key: continue
+        block[key] = value
+        if key == "progress": # Last key of every block
+            if on_progress:
+                on_progress(*progress_from_block(block, duration))
+            block = {}
+
+    proc.wait()
+    reader.join()
+    if feeder is not None:
+        feeder.join()
+    if feed_error:
+        # ffmpeg saw a clean EOF and may have succeeded with a truncated input
+        tail.append(feed_error[0])
+        return proc.returncode or 1, "\n".join(tail)
+    return proc.returncode, "\n".join(tail)
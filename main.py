@@ -5,77 +5,213 @@ import threading
 import json
 import time
 import base64
-import requests # Direct HTTP
-import google.auth.transport.requests
-from google.oauth2 import service_account
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QPushButton, QLabel, QFileDialog, QScrollArea, 
-                             QGridLayout, QMessageBox, QProgressBar, QTabWidget,
+                             QPushButton, QLabel, QFileDialog,
+                             QMessageBox, QProgressBar, QTabWidget,
                              QRadioButton, QButtonGroup, QLineEdit, QFormLayout, QFrame,
                              QCheckBox, QGroupBox, QDialog, QComboBox, QTextEdit, QSizePolicy,
                              QListWidget, QListWidgetItem, QInputDialog, QTableWidget, 
-                             QTableWidgetItem, QHeaderView, QAbstractItemView, QSlider, QSpinBox)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QEvent, QSize, QTimer
-from PyQt6.QtGui import QPixmap, QFont, QKeyEvent, QIcon
-import shutil
-import uuid
+                             QTableWidgetItem, QHeaderView, QAbstractItemView, QSlider, QSpinBox,
+                             QProgressDialog, QListView, QStyle, QStyleOptionViewItem,
+                             QStyledItemDelegate)
+from PyQt6.QtCore import (Qt, QThread, pyqtSignal, QEvent, QSize, QTimer, QObject, QRunnable,
+                          QThreadPool, QAbstractListModel, QModelIndex)
+from PyQt6.QtGui import QPixmap, QFont, QKeyEvent, QIcon, QImage, QImageReader, QColor
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ffmpeg_caps import start_capability_probe
+from media_probe import get_probe_cache
+from thumbnails import get_video_thumbnail
+from extraction import extract_slides, list_slide_files, slide_timeline
+from slide_dedup import dedupe_slides
+from assembly import default_chunk_workers, assemble_video, match_videos_to_rows, TRANSITIONS
+from prepare import prepared_output_path, trimmed_duration, run_prepare
+from batch_prepare import (DONE, FAILED, list_source_videos, batch_prepare, default_batch_workers,
+                           summarize_batch, format_batch_summary, write_batch_report)
+from render_queue import RenderQueue, RUNNING, FINISHED_STATES
+from vertex import get_vertex_client, generate_videos, DEFAULT_CONCURRENCY, DEFAULT_REQUESTS_PER_MINUTE
 
 DEFAULT_KEY_PATH = os.path.join(os.getcwd(), "aivideowear-85d19890ba52.json")
-API_ENDPOINT_TEMPLATE = "https://us-central1-aiplatform.googleapis.com/v1/projects/{PROJECT_ID}/locations/us-central1/publishers/google/models/{MODEL_ID}:predict"
+VERTEX_MODELS = ["veo-2.0-generate-001", "veo-3.0-generate-001", "veo-3.0-fast-generate-001"]
 
 
 
 # --- CUSTOM WIDGETS ---
-class ClickableLabel(QLabel):
-    clicked = pyqtSignal()
-    def mousePressEvent(self, event):
-        self.clicked.emit()
-        super().mousePressEvent(event)
-
-class SelectableImageWidget(QWidget):
-    def __init__(self, image_path, parent=None):
+GALLERY_THUMB_SIZE = QSize(160, 90)
+GALLERY_CACHE_ENTRIES = 300 # Decoded thumbnails kept; older off-screen ones are evicted
+LIGHTBOX_PREFETCH = 2 # Pre-decoded neighbours kept on each side of the current image
+
+def parse_slide_timestamp(filename):
+    """ 'frame_0001__01-23-456.png' -> '01:23.456' (None if the name has no timestamp) """
+    if "__" not in filename: return None
+    try:
+        ts_part = filename.split("__")[1].split(".")[0] # 01-23-456
+        return ts_part.replace("-", ":", 1).replace("-", ".", 1)
+    except Exception:
+        return None
+
+def read_scaled_image(path, size):
+    """ Decodes path directly to fit size (aspect kept). Returns a QImage, safe off the GUI thread """
+    reader = QImageReader(path)
+    full = reader.size()
+    if full.isValid():
+        reader.setScaledSize(full.scaled(size, Qt.AspectRatioMode.KeepAspectRatio))
+    return reader.read()
+
+class ThumbnailLoadTask(QRunnable):
+    """ Decodes one image to a target size on a pool thread and reports it via notifier """
+    def __init__(self, notifier, row, path, size):
+        super().__init__()
+        self.notifier = notifier
+        self.row = row
+        self.path = path
+        self.size = size
+
+    def run(self):
+        self.notifier.loaded.emit(self.row, self.path, read_scaled_image(self.path, self.size))
+
+class ThumbnailNotifier(QObject):
+    loaded = pyqtSignal(int, str, QImage)
+
+class SlideGalleryModel(QAbstractListModel):
+    """
+    Slide list for the Extract tab. Thumbnails are decoded lazily - only when the
+    view asks for a visible cell - on a background pool, and held in an LRU.
+    """
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.image_path = image_path
-        self.selected = False
-        
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(5, 5, 5, 5)
-        
-        self.thumb_label = ClickableLabel()
-        self.thumb_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.thumb_label.setStyleSheet("border: 1px solid #555;")
-        self.thumb_label.setCursor(Qt.CursorShape.PointingHandCursor)
-        
-        pix = QPixmap(image_path)
-        if not pix.isNull():
-             self.thumb_label.setPixmap(pix.scaled(160, 90, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
-        
-        layout.addWidget(self.thumb_label)
-        self.checkbox = QCheckBox("Select")
-        layout.addWidget(self.checkbox)
-        self.checkbox.toggled.connect(self.on_toggle)
-
-    def on_toggle(self, checked):
-        self.selected = checked
-
-    def set_timestamp(self, text):
-        # Create label if not exists
-        if not hasattr(self, 'lbl_time'):
-            self.lbl_time = QLabel(text)
-            self.lbl_time.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.lbl_time.setStyleSheet("color: #00E676; font-size: 11px; font-weight: bold;")
-            self.layout().insertWidget(2, self.lbl_time) # Insert before checkbox (index 2)
-        else:
-            self.lbl_time.setText(text)
+        self.slides = [] # [{path, timestamp, checked}]
+        self.pixmaps = OrderedDict() # path -> QPixmap (LRU)
+        self.pending = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(2, min(4, os.cpu_count() or 1)))
+        self.notifier = ThumbnailNotifier()
+        self.notifier.loaded.connect(self.on_thumbnail_loaded)
+        self.placeholder = QPixmap(GALLERY_THUMB_SIZE)
+        self.placeholder.fill(QColor("#333"))
+
+    def set_images(self, paths):
+        self.beginResetModel()
+        self.slides = [{"path": p, "timestamp": parse_slide_timestamp(os.path.basename(p)), "checked": False} for p in paths]
+        self.pixmaps.clear()
+        self.pending.clear()
+        self.pool.clear() # Drop queued decodes for the old folder
+        self.endResetModel()
+
+    def add_image(self, path, timestamp=None):
+        row = len(self.slides)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.slides.append({"path": path, "timestamp": timestamp or parse_slide_timestamp(os.path.basename(path)), "checked": False})
+        self.endInsertRows()
+
+    def paths(self):
+        return [s["path"] for s in self.slides]
+
+    def checked_paths(self):
+        return [s["path"] for s in self.slides if s["checked"]]
+
+    def set_all_checked(self, checked):
+        for s in self.slides: s["checked"] = checked
+        if self.slides:
+            self.dataChanged.emit(self.index(0), self.index(len(self.slides) - 1), [Qt.ItemDataRole.CheckStateRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.slides)
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsUserCheckable
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        slide = self.slides[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return slide["timestamp"] or os.path.basename(slide["path"])
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self.thumbnail(index.row(), slide["path"])
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if slide["checked"] else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.ForegroundRole and slide["timestamp"]:
+            return QColor("#00E676")
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return slide["path"]
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if index.isValid() and role == Qt.ItemDataRole.CheckStateRole:
+            self.slides[index.row()]["checked"] = Qt.CheckState(value) == Qt.CheckState.Checked
+            self.dataChanged.emit(index, index, [role])
+            return True
+        return False
+
+    def thumbnail(self, row, path):
+        pix = self.pixmaps.get(path)
+        if pix is not None:
+            self.pixmaps.move_to_end(path)
+            return pix
+        # Only cells the view actually paints get here, so off-screen slides are never decoded
+        if path not in self.pending:
+            self.pending.add(path)
+            self.pool.start(ThumbnailLoadTask(self.notifier, row, path, GALLERY_THUMB_SIZE))
+        return self.placeholder
+
+    def on_thumbnail_loaded(self, row, path, image):
+        self.pending.discard(path)
+        if row >= len(self.slides) or self.slides[row]["path"] != path: return # Model was reset meanwhile
+        self.pixmaps[path] = QPixmap.fromImage(image) if not image.isNull() else self.placeholder
+        while len(self.pixmaps) > GALLERY_CACHE_ENTRIES:
+            self.pixmaps.popitem(last=False)
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DecorationRole])
+
+class SlideGalleryView(QListView):
+    """ Icon grid over SlideGalleryModel; a click outside the checkbox asks for a preview """
+    preview_requested = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setIconSize(GALLERY_THUMB_SIZE)
+        self.setGridSize(QSize(GALLERY_THUMB_SIZE.width() + 20, GALLERY_THUMB_SIZE.height() + 40))
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setMovement(QListView.Movement.Static)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.LayoutMode.Batched) # Big folders lay out incrementally
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setCursor(Qt.CursorShape.PointingHandCursor)
+        # Python-owned delegate: PyQt only allows its protected initStyleOption on those
+        self.setItemDelegate(QStyledItemDelegate(self))
+
+    def check_indicator_rect(self, index):
+        option = QStyleOptionViewItem()
+        self.initViewItemOption(option)
+        option.rect = self.visualRect(index)
+        self.itemDelegate().initStyleOption(option, index)
+        return self.style().subElementRect(QStyle.SubElement.SE_ItemViewItemCheckIndicator, option, self)
+
+    def mouseReleaseEvent(self, event):
+        pos = event.position().toPoint()
+        index = self.indexAt(pos)
+        on_checkbox = index.isValid() and self.check_indicator_rect(index).contains(pos)
+        super().mouseReleaseEvent(event)
+        if index.isValid() and not on_checkbox and event.button() == Qt.MouseButton.LeftButton:
+            self.preview_requested.emit(index.row())
 
 class LightboxDialog(QDialog):
     def __init__(self, image_paths, current_index, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Lightbox Viewer")
-        self.showFullScreen()
         self.image_paths = image_paths
         self.current_index = current_index
+        # Ring buffer of pre-scaled neighbours (index -> QPixmap), filled in the background
+        self.buffer = {}
+        self.pending = set()
+        self.notifier = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.reset_buffer()
+        self.showFullScreen()
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0,0,0,0)
         self.image_label = QLabel()
@@ -95,12 +231,51 @@ class LightboxDialog(QDialog):
         layout.addLayout(controls)
         self.load_image()
 
+    def reset_buffer(self):
+        """ Drops every buffered image; results from in-flight loads are ignored """
+        if self.notifier:
+            self.notifier.loaded.disconnect()
+        self.notifier = ThumbnailNotifier()
+        self.notifier.loaded.connect(self.on_prefetched)
+        self.buffer.clear()
+        self.pending.clear()
+        self.pool.clear()
+
     def load_image(self):
+        if not hasattr(self, 'image_label'): return # resize during construction
         if 0 <= self.current_index < len(self.image_paths):
-            path = self.image_paths[self.current_index]
-            pix = QPixmap(path)
-            self.image_label.setPixmap(pix.scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+            pix = self.buffer.get(self.current_index)
+            if pix is None:
+                # Cold miss (first image / fast key repeat): decode now
+                path = self.image_paths[self.current_index]
+                pix = QPixmap.fromImage(read_scaled_image(path, self.size()))
+                self.buffer[self.current_index] = pix
+            self.image_label.setPixmap(pix)
             self.lbl_counter.setText(f"{self.current_index + 1} / {len(self.image_paths)}")
+            self.prefetch()
+
+    def prefetch(self):
+        cur = self.current_index
+        for i in list(self.buffer):
+            if abs(i - cur) > LIGHTBOX_PREFETCH:
+                del self.buffer[i]
+        # Nearest first, alternating forward/back
+        for step in range(1, LIGHTBOX_PREFETCH + 1):
+            for i in (cur + step, cur - step):
+                if 0 <= i < len(self.image_paths) and i not in self.buffer and i not in self.pending:
+                    self.pending.add(i)
+                    self.pool.start(ThumbnailLoadTask(self.notifier, i, self.image_paths[i], self.size()))
+
+    def on_prefetched(self, index, path, image):
+        self.pending.discard(index)
+        if abs(index - self.current_index) > LIGHTBOX_PREFETCH or image.isNull(): return
+        self.buffer[index] = QPixmap.fromImage(image)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Buffered images were scaled for the old size
+        self.reset_buffer()
+        self.load_image()
 
     def keyPressEvent(self, event: QKeyEvent):
         if event.key() == Qt.Key.Key_Left:
@@ -116,27 +291,72 @@ class LightboxDialog(QDialog):
 
 # --- WORKERS ---
 
-class FFmpegWorker(QThread):
+class PrepareWorker(QThread):
+    """ Watermark / trim step (see prepare.run_prepare) """
     finished = pyqtSignal(bool, str, str) 
-    def __init__(self, command, task_type):
+    encode_progress = pyqtSignal(float, float, float) # percent, fps, speed
+    def __init__(self, video_path, output_path, logo_path, wm_x, wm_y, trim_seconds, duration=0.0,
+                 stream_copy=True, accurate=False, logo_width=None, target_speed=None):
         super().__init__()
-        self.command = command
-        self.task_type = task_type 
+        self.video_path = video_path
+        self.output_path = output_path
+        self.logo_path = logo_path
+        self.wm_x = wm_x
+        self.wm_y = wm_y
+        self.trim_seconds = trim_seconds
+        self.duration = duration # Source length; the trimmed length drives percent progress
+        self.stream_copy = stream_copy
+        self.accurate = accurate
+        self.logo_width = logo_width
+        self.target_speed = target_speed
+        self.task_type = 'process'
     def run(self):
         try:
-            process = subprocess.run(self.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, **get_subprocess_kwargs())
-            if process.returncode == 0:
-                # SUCCESS: Emit stderr too because metadata=print goes there
-                self.finished.emit(True, "Operation Successful", process.stderr)
-            else:
-                self.finished.emit(False, process.stderr, "")
+            run_prepare(self.video_path, self.output_path, self.logo_path, self.wm_x, self.wm_y, self.trim_seconds,
+                        self.duration, self.encode_progress.emit, self.stream_copy, self.accurate,
+                        logo_width=self.logo_width, target_speed=self.target_speed)
+            self.finished.emit(True, "Operation Successful", "")
         except Exception as e:
             self.finished.emit(False, str(e), "")
 
+class ExtractWorker(QThread):
+    """ Slide extraction engines; same signals as PrepareWorker so on_ffmpeg_done handles it """
+    finished = pyqtSignal(bool, str, str)
+    encode_progress = pyqtSignal(float, float, float) # percent, fps, speed
+    slide_found = pyqtSignal(str, float, float) # final path, pts_time, scene score (full mode, live)
+    def __init__(self, video_path, output_dir, mode, duration=0.0):
+        super().__init__()
+        self.video_path = video_path
+        self.output_dir = output_dir
+        self.mode = mode # 'full' | 'fast' | 'segments'
+        self.duration = duration
+        self.task_type = 'extract'
+    def run(self):
+        try:
+            written = extract_slides(self.video_path, self.output_dir, self.mode, self.duration,
+                                     self.encode_progress.emit, self.slide_found.emit)
+            # Frames are already named frame_NNNN__MM-SS-mmm.png, so there is no log to parse
+            self.finished.emit(True, f"Extracted {len(written)} slides", "")
+        except Exception as e:
+            self.finished.emit(False, str(e), "")
 
+class DedupWorker(QThread):
+    """ Collapses near-identical extracted slides (perceptual hash) """
+    finished_signal = pyqtSignal(str, str) # directory, summary note
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+    def run(self):
+        try:
+            kept, removed = dedupe_slides(self.directory)
+            note = f"Merged {removed} near-duplicate slides ({kept} kept)." if removed else ""
+        except Exception as e:
+            note = f"Duplicate merge skipped: {e}"
+        self.finished_signal.emit(self.directory, note)
 
 class AssemblyWorker(QThread):
     progress_signal = pyqtSignal(int, int, str)
+    encode_progress = pyqtSignal(float, float, float) # percent of current step, fps, speed
     finished_signal = pyqtSignal(bool, str)
 
     def __init__(self, clip_data, output_path, mix_settings=None):
@@ -148,218 +368,10 @@ class AssemblyWorker(QThread):
 
     def run(self):
         try:
-            if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
-            os.makedirs(self.temp_dir)
-
-            processed_clips = []
-            total = len(self.clip_data)
-
-            # 1. Process Clips
-            # Transition Settings
-            transition = self.mix_settings.get("transition", "None")
-            fade_dur = 0.5 # Duration for fade in/out
-
-            for i, clip in enumerate(self.clip_data):
-                self.progress_signal.emit(i+1, total + 2, f"Processing clip {i+1}/{total}...")
-                
-                input_video = clip.get('video')
-                input_image = clip.get('image') # New for fallback
-                target_dur = clip['target_dur']
-                source_dur = clip.get('source_dur', 0)
-                
-                chunk_out = os.path.join(self.temp_dir, f"chunk_{i:04d}.mp4")
-                
-                # --- FADE FILTERS (Common Logic) ---
-                # Fade In (Start of clip) and Fade Out (End of clip)
-                # Video Fade: fade=t=in:st=0:d=0.5,fade=t=out:st={dur-0.5}:d=0.5
-                # Audio Fade: afade=t=in:ss=0:d=0.5,afade=t=out:st={dur-0.5}:d=0.5
-                
-                v_fade = ""
-                a_fade = ""
-                
-                if transition in ["Fade Black", "Fade White"]:
-                    color = "black" if transition == "Fade Black" else "white"
-                    st_out = max(0, target_dur - fade_dur)
-                    
-                    # Video Fades
-                    v_fade = f",fade=t=in:st=0:d={fade_dur}:color={color}"
-                    v_fade += f",fade=t=out:st={st_out}:d={fade_dur}:color={color}"
-                    
-                    # Audio Fades (Only if video input exists)
-                    if input_video:
-                         a_fade = f",afade=t=in:ss=0:d={fade_dur}"
-                         a_fade += f",afade=t=out:st={st_out}:d={fade_dur}"
-                
-                if input_image and not input_video:
-                    # --- ZOOM GENERATION ---
-                    # Logic: Create a video from image with Zoom
-                    zoom_amt = self.mix_settings.get("zoom_amount", 110)
-                    zoom_factor = zoom_amt / 100.0
-                    
-                    # duration in frames (approx 30fps)
-                    d_frames = int(target_dur * 30)
-                    
-                    # Zoompan filter:
-                    # z='1+((1.1-1)*(on/duration))' -> linear zoom from 1.0 to 1.1
-                    z_expr = f"1+({zoom_factor}-1)*(on/{d_frames})"
-                    
-                    # Add FADE to zoompan? No, chain it.
-                    # Note: zoompan resets timestamps, better to chain fade after.
-                    
-                    # Zoom Filter (Supersampled to reduce jitter)
-                    # We render at 2560x1440 (2x) then scale down to smooth the movement.
-                    zoom_filter = f"zoompan=z='{z_expr}':x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':d={d_frames}:s=2560x1440:fps=30,scale=1280:720"
-                    
-                    # Combine Filters: Zoom -> Fade
-                    full_v_filter = f"[0:v]{zoom_filter}{v_fade}[v]"
-                    
-                    cmd = [
-                        "ffmpeg", "-loop", "1", "-i", input_image,
-                        "-f", "lavfi", "-i", f"anullsrc=channel_layout=stereo:sample_rate=44100:duration={target_dur}",
-                        "-filter_complex", full_v_filter,
-                        "-map", "[v]", "-map", "1:a",
-                        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac",
-                        "-t", str(target_dur),
-                        "-y", chunk_out
-                    ]
-                    
-                    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **get_subprocess_kwargs())
-
-                elif input_video:
-                    # --- VIDEO SPEED ADJUST ---
-                    # Speed Calculation
-                    speed = source_dur / target_dur
-                    speed = max(0.1, min(speed, 100.0))
-
-                    # Filters
-                    video_filter = f"setpts=PTS/{speed}"
-                    # Append Fade Video
-                    video_filter += v_fade
-                    
-                    audio_chain = []
-                    remaining_speed = speed
-                    while remaining_speed > 2.0:
-                        audio_chain.append("atempo=2.0")
-                        remaining_speed /= 2.0
-                    while remaining_speed < 0.5:
-                        audio_chain.append("atempo=0.5")
-                        remaining_speed /= 0.5
-                    audio_chain.append(f"atempo={remaining_speed}")
-                    
-                    audio_filter = ",".join(audio_chain)
-                    # Append Fade Audio
-                    audio_filter += a_fade
-                    
-                    # Scale/Pad
-                    video_filter += ",scale=1280:720:force_original_aspect_ratio=decrease,pad=1280:720:(ow-iw)/2:(oh-ih)/2,fps=30"
-
-                    cmd = [
-                        "ffmpeg", "-i", input_video, 
-                        "-filter:v", video_filter,
-                        "-filter:a", audio_filter,
-                        "-c:v", "libx264", "-c:a", "aac", 
-                        "-y", chunk_out
-                    ]
-                    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **get_subprocess_kwargs())
-                
-                if os.path.exists(chunk_out):
-                    processed_clips.append(chunk_out)
-
-            # 2. Concat
-            self.progress_signal.emit(total + 1, total + 2, "Concatenating...")
-            concat_list_path = os.path.join(self.temp_dir, "list.txt")
-            with open(concat_list_path, "w", encoding='utf-8') as f:
-                for p in processed_clips:
-                    # Escape paths for FFmpeg concat file (forward slashes + quoting)
-                    p_safe = p.replace("\\", "/").replace("'", "'\\''") 
-                    f.write(f"file '{p_safe}'\n")
-
-            temp_assembly = os.path.join(self.temp_dir, "temp_full.mp4")
-            
-            cmd_concat = [
-                "ffmpeg", "-f", "concat", "-safe", "0", 
-                "-i", concat_list_path, 
-                "-c", "copy", "-y", temp_assembly
-            ]
-            subprocess.run(cmd_concat, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **get_subprocess_kwargs())
-            
-            # 3. Audio Mixing (Optional)
-            final_target = self.output_path
-            
-            if self.mix_settings and self.mix_settings.get("enabled"):
-                self.progress_signal.emit(total + 2, total + 2, "Mixing Audio...")
-                
-                original_vid = self.mix_settings.get("original_path")
-                gen_vol = self.mix_settings.get("generated_vol", 0.25)
-                
-                final_mix_output = temp_assembly # Default if mixing fails or not needed
-                
-                if original_vid and os.path.exists(original_vid):
-                    # Check if generated video has audio stream
-                    has_gen_audio = False
-                    try:
-                        probe_cmd = ["ffprobe", "-v", "error", "-select_streams", "a", "-show_entries", "stream=codec_type", "-of", "csv=p=0", temp_assembly]
-                        p_res = subprocess.run(probe_cmd, stdout=subprocess.PIPE, text=True, **get_subprocess_kwargs())
-                        if p_res.stdout.strip(): has_gen_audio = True
-                    except: pass
-
-                    mix_temp = os.path.join(self.temp_dir, "mixed_temp.mp4")
-                    
-                    if has_gen_audio:
-                        # Mix Both: [0:a]volume={gen_vol}[a0];[1:a]volume=1.0[a1];[a0][a1]amix...
-                        filter_complex = f"[0:a]volume={gen_vol:.2f}[a0];[1:a]volume=1.0[a1];[a0][a1]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]"
-                        cmd_mix = [
-                            "ffmpeg", "-i", temp_assembly, "-i", original_vid,
-                            "-filter_complex", filter_complex,
-                            "-map", "0:v:0", "-map", "[aout]",
-                            "-c:v", "copy", "-c:a", "aac", "-b:a", "192k",
-                            "-shortest", "-y", mix_temp
-                        ]
-                    else:
-                        # No generated audio: Pass original audio through (100% vol)
-                        # We just map video from 0 and audio from 1
-                        cmd_mix = [
-                            "ffmpeg", "-i", temp_assembly, "-i", original_vid,
-                            "-map", "0:v:0", "-map", "1:a:0",
-                            "-c:v", "copy", "-c:a", "copy",
-                            "-shortest", "-y", mix_temp
-                        ]
-
-                    subprocess.run(cmd_mix, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **get_subprocess_kwargs())
-                    
-                    if os.path.exists(mix_temp):
-                        final_mix_output = mix_temp
-                    else:
-                         print("DEBUG: Mix failed, using temp_assembly")
-            else:
-                 final_mix_output = temp_assembly
-
-            # 4. Audio Normalization (Optional)
-            if self.mix_settings and self.mix_settings.get("audio_norm"):
-                self.progress_signal.emit(total + 2, total + 2, "Normalizing Audio (Loudnorm)...")
-                # loudnorm=I=-16:TP=-1.5:LRA=11
-                
-                norm_temp = os.path.join(self.temp_dir, "normalized.mp4")
-                
-                cmd_norm = [
-                    "ffmpeg", "-i", final_mix_output,
-                    "-af", "loudnorm=I=-16:TP=-1.5:LRA=11",
-                    "-c:v", "copy",
-                    "-c:a", "aac", "-b:a", "192k",
-                    "-y", norm_temp
-                ]
-                subprocess.run(cmd_norm, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **get_subprocess_kwargs())
-                
-                if os.path.exists(norm_temp):
-                    shutil.move(norm_temp, final_target)
-                else:
-                    # Fallback to mix output if norm failed
-                     shutil.move(final_mix_output, final_target)
-            else:
-                # No normalization: Just move mixed output
-                shutil.move(final_mix_output, final_target)
-
+            final_target = assemble_video(
+                self.clip_data, self.output_path, self.mix_settings, self.temp_dir,
+                self.progress_signal.emit, self.encode_progress.emit
+            )
             self.finished_signal.emit(True, final_target)
 
         except Exception as e:
@@ -367,6 +379,136 @@ class AssemblyWorker(QThread):
             traceback.print_exc()
             self.finished_signal.emit(False, str(e))
 
+class VertexWorker(QThread):
+    """ Image-to-video generation for the selected slides, several predictions in flight """
+    progress_signal = pyqtSignal(int, int, str)
+    video_generated = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str)
+
+    def __init__(self, key_path, target_images, model, prompt, duration,
+                 max_workers=DEFAULT_CONCURRENCY, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE):
+        super().__init__()
+        self.key_path = key_path
+        self.target_images = list(target_images)
+        self.model = model
+        self.prompt = prompt
+        self.duration = duration
+        self.max_workers = max_workers
+        self.requests_per_minute = requests_per_minute
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            client = get_vertex_client(self.key_path)
+            out_dir = os.path.join(os.path.dirname(self.target_images[0]), "generated_videos")
+            total = len(self.target_images)
+            done = [0]
+            failures = []
+            def on_done(i, path, error, cached):
+                done[0] += 1
+                name = os.path.basename(self.target_images[i])
+                if path:
+                    self.video_generated.emit(path)
+                    self.progress_signal.emit(done[0], total, f"{'Reused cached' if cached else 'Generated'} {name}")
+                else:
+                    failures.append(f"{name}: {error}")
+                    self.progress_signal.emit(done[0], total, f"Failed {name}")
+
+            self.progress_signal.emit(0, total, f"Submitting {total} predictions...")
+            generate_videos(client, self.target_images, self.model, self.prompt, self.duration, out_dir,
+                            self.max_workers, self.requests_per_minute, on_done, self.cancel_event)
+            print(f"DEBUG: Vertex latency: {client.metrics.format()}")
+            if failures:
+                self.finished_signal.emit(False, f"{len(failures)} of {total} failed:\n" + "\n".join(failures))
+            else:
+                self.finished_signal.emit(True, out_dir)
+        except Exception as e:
+            self.finished_signal.emit(False, str(e))
+
+class CapabilityNotifier(QObject):
+    """ Delivers the background ffmpeg capability probe result on the GUI thread """
+    ready = pyqtSignal(object) # FFmpegCapabilities
+
+class BatchPrepareWorker(QThread):
+    """ Same prepare settings over many videos on a bounded pool (see batch_prepare) """
+    file_progress = pyqtSignal(int, float) # row, percent
+    file_done = pyqtSignal(int, object) # row, result dict
+    finished_signal = pyqtSignal(object, str) # summary dict, report path ("" if it couldn't be written)
+
+    def __init__(self, videos, options, report_dir, max_workers=None):
+        super().__init__()
+        self.videos = videos
+        self.options = options
+        self.report_dir = report_dir
+        self.max_workers = max_workers
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        start = time.perf_counter()
+        results = batch_prepare(self.videos, self.options, self.max_workers,
+                                lambda i, percent, fps, speed: self.file_progress.emit(i, percent),
+                                self.file_done.emit, self.cancel_event)
+        wall = time.perf_counter() - start
+        try:
+            report = write_batch_report(results, wall, self.report_dir, self.options)
+        except OSError as e:
+            print(f"DEBUG: Batch report not written: {e}")
+            report = ""
+        self.finished_signal.emit(summarize_batch(results, wall), report)
+
+class RenderQueueNotifier(QObject):
+    """ Carries RenderQueue change callbacks (render threads) onto the GUI thread """
+    changed = pyqtSignal(str) # job id, "" for queue-wide changes
+
+class BatchAssignWorker(QThread):
+    """ Probes + thumbnails many videos concurrently; rows are filled in as results arrive """
+    row_ready = pyqtSignal(int, str, float, object) # row, path, duration, thumbnail bytes
+    progress_signal = pyqtSignal(int, int, str)
+    finished_signal = pyqtSignal(int, bool) # assigned count, cancelled
+
+    def __init__(self, assignments, max_workers=None):
+        super().__init__()
+        self.assignments = assignments # [(row, path), ...]
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @staticmethod
+    def load_video(path):
+        dur = 0.0
+        try: dur = get_probe_cache().get_duration(path)
+        except Exception: pass
+        thumb_data = None
+        try: thumb_data = get_video_thumbnail(path)
+        except Exception: pass
+        return dur, thumb_data
+
+    def run(self):
+        total = len(self.assignments)
+        done = 0
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {pool.submit(self.load_video, path): (row, path) for row, path in self.assignments}
+            for future in as_completed(futures):
+                if self._cancelled: break
+                row, path = futures[future]
+                dur, thumb_data = future.result()
+                self.row_ready.emit(row, path, dur, thumb_data)
+                done += 1
+                self.progress_signal.emit(done, total, f"Assigned {os.path.basename(path)}")
+        finally:
+            # Queued-but-unstarted probes are dropped on cancel
+            pool.shutdown(wait=True, cancel_futures=True)
+        self.finished_signal.emit(done, self._cancelled)
+
 class ClipTableWidget(QTableWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -446,45 +588,37 @@ class ClipTableWidget(QTableWidget):
         else: self.setItem(row2, 4, QTableWidgetItem("-"))
 
     def set_video_for_row(self, row, video_path):
+        thumb_data = None
+        dur = 0.0
+        if video_path and os.path.exists(video_path):
+            try: thumb_data = get_video_thumbnail(video_path)
+            except Exception: pass
+            dur = self.get_duration(video_path)
+        self.apply_video_to_row(row, video_path, dur, thumb_data)
+
+    def apply_video_to_row(self, row, video_path, dur, thumb_data):
+        """ UI half of set_video_for_row: probing/thumbnailing already done (possibly off-thread) """
         fname = os.path.basename(video_path) if video_path else "Drop Video Here"
         item = QTableWidgetItem(fname)
         
         if video_path and os.path.exists(video_path):
             item.setData(Qt.ItemDataRole.UserRole, video_path)
-            # Generate Thumbnail
-            try:
-                temp_thumb = os.path.join(os.path.dirname(video_path), f".thumb_{uuid.uuid4().hex[:8]}.jpg")
-                # Fast seek to 1s, scale to height 56 (matching icon size)
-                cmd = [
-                    "ffmpeg", "-ss", "00:00:01", "-i", video_path, 
-                    "-vframes", "1", "-vf", "scale=-1:56", 
-                    "-y", temp_thumb
-                ]
-                subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **get_subprocess_kwargs())
-                
-                if os.path.exists(temp_thumb):
-                    pix = QPixmap(temp_thumb) 
-                    if not pix.isNull():
-                        item.setIcon(QIcon(pix))
-                    try: os.remove(temp_thumb)
-                    except: pass
-            except: 
-                pass
+            if thumb_data:
+                pix = QPixmap()
+                if pix.loadFromData(thumb_data):
+                    item.setIcon(QIcon(pix))
         else:
              item.setData(Qt.ItemDataRole.UserRole, None)
              
         self.setItem(row, 3, item)
         
         # Duration
-        dur = self.get_duration(video_path) if video_path else 0.0
         self.setItem(row, 4, QTableWidgetItem(str(dur) + "s"))
         self.item(row, 4).setData(Qt.ItemDataRole.UserRole, dur)
 
     def get_duration(self, path):
         try:
-            cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", path]
-            res = subprocess.run(cmd, stdout=subprocess.PIPE, text=True, **get_subprocess_kwargs())
-            return float(res.stdout.strip())
+            return get_probe_cache().get_duration(path)
         except: return 0.0
 
     def notify_change(self):
@@ -508,13 +642,6 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-def get_subprocess_kwargs():
-    """ Returns platform-specific kwargs to hide console window on Windows """
-    kwargs = {}
-    if os.name == 'nt':
-        kwargs['creationflags'] = 0x08000000 # CREATE_NO_WINDOW
-    return kwargs
-
 def open_file_native(path):
     """ Opens a file or directory using the OS native handler """
     if not os.path.exists(path): return
@@ -653,10 +780,16 @@ class VideoToolsApp(QMainWindow):
         self.project_data = {} 
         self.current_video_path = ""
         self.video_duration = 0.0
-        self.image_widgets = []
         self.clip_table = None
         self.slides_dir = None
         self.generated_videos = []
+        self.current_step_msg = ""
+        self.vertex_key_path = DEFAULT_KEY_PATH
+        self.target_images = []
+
+        # Render queue: persisted on disk, interrupted jobs resume on the next start
+        self.queue_notifier = RenderQueueNotifier()
+        self.render_queue = RenderQueue(on_change=lambda job_id: self.queue_notifier.changed.emit(job_id or ""))
 
         central = QWidget()
         self.setCentralWidget(central)
@@ -681,6 +814,10 @@ class VideoToolsApp(QMainWindow):
         self.progress = QProgressBar()
         self.progress.hide()
         self.main_layout.addWidget(self.progress)
+
+        self.queue_notifier.changed.connect(self.refresh_queue_table)
+        self.refresh_queue_table()
+        self.render_queue.schedule()
         
 
 
@@ -688,7 +825,14 @@ class VideoToolsApp(QMainWindow):
 
 
     def closeEvent(self, event):
-        # Persistence removed
+        # Running renders are stopped and saved as queued; they resume next launch
+        self.render_queue.shutdown()
+        if getattr(self, 'v_worker', None):
+            self.v_worker.cancel()
+        if getattr(self, 'batch_worker', None):
+            self.batch_worker.cancel()
+        if getattr(self, 'batch_prepare_worker', None):
+            self.batch_prepare_worker.cancel()
         super().closeEvent(event)
 
     def reset_project(self):
@@ -716,12 +860,8 @@ class VideoToolsApp(QMainWindow):
         self.btn_process.setEnabled(False)
         
         # 4. Reset Extract
-        if hasattr(self, 'results_grid'):
-            while self.results_grid.count():
-                item = self.results_grid.takeAt(0)
-                w = item.widget()
-                if w: w.deleteLater()
-        self.image_widgets = []
+        if hasattr(self, 'gallery_model'):
+            self.gallery_model.set_images([])
         
         # 5. Reset Finishing
         if self.clip_table:
@@ -781,6 +921,15 @@ class VideoToolsApp(QMainWindow):
         self.wm_y = QLineEdit("640")
         form_wm.addRow("Pos X:", self.wm_x)
         form_wm.addRow("Pos Y:", self.wm_y)
+        self.wm_width = QLineEdit()
+        self.wm_width.setPlaceholderText("Original size")
+        form_wm.addRow("Logo width (px):", self.wm_width)
+        # Throughput target for the watermark encode: picks the x264 preset/CRF
+        self.combo_encode_speed = QComboBox()
+        self.combo_encode_speed.addItem("Encoder default", None)
+        for speed in (1, 2, 4, 8):
+            self.combo_encode_speed.addItem(f"Realtime x{speed}", float(speed))
+        form_wm.addRow("Encode speed:", self.combo_encode_speed)
         v_wm.addLayout(form_wm)
         
         # Logo Preview
@@ -800,12 +949,50 @@ class VideoToolsApp(QMainWindow):
         self.trim_seconds_input = QLineEdit("3")
         form_trim.addRow("Seconds to cut:", self.trim_seconds_input)
         v_trim.addLayout(form_trim)
+        # Without a logo nothing needs decoding: copy the streams and just cut
+        self.chk_stream_copy = QCheckBox("Fast trim without re-encoding (when no logo)")
+        self.chk_stream_copy.setChecked(True)
+        v_trim.addWidget(self.chk_stream_copy)
+        self.chk_accurate_trim = QCheckBox("Frame-accurate cut (re-encodes only the last GOP)")
+        self.chk_accurate_trim.setChecked(False)
+        self.chk_stream_copy.toggled.connect(self.chk_accurate_trim.setEnabled)
+        v_trim.addWidget(self.chk_accurate_trim)
         layout.addWidget(gb_trim)
         self.btn_process = QPushButton("Process Video (Apply Logo & Trim)")
         self.btn_process.setFixedHeight(40)
         self.btn_process.clicked.connect(self.run_process)
         self.btn_process.setEnabled(False)
         layout.addWidget(self.btn_process)
+
+        # Same logo / trim settings over a whole folder
+        gb_batch = QGroupBox("Batch Prepare")
+        v_batch = QVBoxLayout(gb_batch)
+        h_batch = QHBoxLayout()
+        self.btn_batch_prepare = QPushButton("Process Folder...")
+        self.btn_batch_prepare.clicked.connect(self.run_batch_prepare)
+        h_batch.addWidget(self.btn_batch_prepare)
+        self.btn_batch_cancel = QPushButton("Cancel Batch")
+        self.btn_batch_cancel.setEnabled(False)
+        self.btn_batch_cancel.clicked.connect(self.cancel_batch_prepare)
+        h_batch.addWidget(self.btn_batch_cancel)
+        h_batch.addStretch()
+        h_batch.addWidget(QLabel("Parallel files:"))
+        self.spin_batch_workers = QSpinBox()
+        self.spin_batch_workers.setRange(1, max(1, os.cpu_count() or 1))
+        self.spin_batch_workers.setValue(default_batch_workers())
+        h_batch.addWidget(self.spin_batch_workers)
+        v_batch.addLayout(h_batch)
+        self.batch_table = QTableWidget(0, 3)
+        self.batch_table.setHorizontalHeaderLabels(["File", "Status", "Progress"])
+        self.batch_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.batch_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.batch_table.verticalHeader().setVisible(False)
+        self.batch_table.setMaximumHeight(180)
+        v_batch.addWidget(self.batch_table)
+        self.lbl_batch_summary = QLabel("")
+        self.lbl_batch_summary.setWordWrap(True)
+        v_batch.addWidget(self.lbl_batch_summary)
+        layout.addWidget(gb_batch)
         self.tabs.addTab(tab, "1. Prepare")
 
     def setup_extract_tab(self):
@@ -819,6 +1006,16 @@ class VideoToolsApp(QMainWindow):
         self.btn_extract.clicked.connect(self.run_extract)
         self.btn_extract.setEnabled(False)
         toolbar.addWidget(self.btn_extract)
+        toolbar.addWidget(QLabel("Mode:"))
+        self.combo_extract_mode = QComboBox()
+        self.combo_extract_mode.addItem("Full Decode", "full")
+        self.combo_extract_mode.addItem("Fast (Two-Stage)", "fast")
+        self.combo_extract_mode.addItem("Parallel Segments", "segments")
+        toolbar.addWidget(self.combo_extract_mode)
+        self.chk_dedup = QCheckBox("Merge Duplicates")
+        self.chk_dedup.setToolTip("Collapse runs of near-identical slides (cursor moves, overlays, animation builds)")
+        self.chk_dedup.setChecked(False)
+        toolbar.addWidget(self.chk_dedup)
         toolbar.addStretch()
         btn_sel_all = QPushButton("Select All")
         btn_sel_all.clicked.connect(lambda: self.set_all_selected(True))
@@ -826,14 +1023,15 @@ class VideoToolsApp(QMainWindow):
         btn_desel_all = QPushButton("Deselect All")
         btn_desel_all.clicked.connect(lambda: self.set_all_selected(False))
         toolbar.addWidget(btn_desel_all)
-        # Removed Vertex Button
+        btn_send_ai = QPushButton("Send to Vertex AI")
+        btn_send_ai.clicked.connect(self.send_to_ai_tab)
+        toolbar.addWidget(btn_send_ai)
         layout.addLayout(toolbar)
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.results_container = QWidget()
-        self.results_grid = QGridLayout(self.results_container)
-        self.scroll_area.setWidget(self.results_container)
-        layout.addWidget(self.scroll_area)
+        self.gallery_model = SlideGalleryModel(self)
+        self.gallery_view = SlideGalleryView()
+        self.gallery_view.setModel(self.gallery_model)
+        self.gallery_view.preview_requested.connect(self.open_lightbox)
+        layout.addWidget(self.gallery_view)
         self.tabs.addTab(tab, "2. Extract")
 
     # Removed setup_vertex_tab
@@ -861,6 +1059,38 @@ class VideoToolsApp(QMainWindow):
         
         self.clip_table = ClipTableWidget()
         layout.addWidget(self.clip_table)
+
+        # AI Video Generation (slides sent from the Extract tab)
+        gb_ai = QGroupBox("AI Video Generation (Vertex)")
+        vbox_ai = QVBoxLayout(gb_ai)
+        hbox_ai = QHBoxLayout()
+        self.lbl_batch_info = QLabel("No images selected")
+        hbox_ai.addWidget(self.lbl_batch_info)
+        hbox_ai.addStretch()
+        btn_key = QPushButton("Select Key")
+        btn_key.clicked.connect(self.select_key_file)
+        hbox_ai.addWidget(btn_key)
+        self.lbl_key_status = QLabel("✅ Default Key" if os.path.exists(DEFAULT_KEY_PATH) else "⚠️ No Key")
+        hbox_ai.addWidget(self.lbl_key_status)
+        hbox_ai.addWidget(QLabel("Model:"))
+        self.combo_model = QComboBox()
+        self.combo_model.addItems(VERTEX_MODELS)
+        hbox_ai.addWidget(self.combo_model)
+        hbox_ai.addWidget(QLabel("Duration:"))
+        self.combo_dur = QComboBox()
+        self.combo_dur.addItems(["8", "6", "5"])
+        hbox_ai.addWidget(self.combo_dur)
+        self.btn_generate = QPushButton("✨ Generate Videos")
+        self.btn_generate.clicked.connect(self.run_vertex_generation)
+        hbox_ai.addWidget(self.btn_generate)
+        vbox_ai.addLayout(hbox_ai)
+        self.prompt_text = QTextEdit()
+        self.prompt_text.setPlaceholderText("Prompt, e.g. slow cinematic camera push-in, subtle motion")
+        self.prompt_text.setMaximumHeight(60)
+        vbox_ai.addWidget(self.prompt_text)
+        self.v_results_layout = QVBoxLayout()
+        vbox_ai.addLayout(self.v_results_layout)
+        layout.addWidget(gb_ai)
         
         # Render Options
         gb_render = QGroupBox("Render Options")
@@ -906,18 +1136,82 @@ class VideoToolsApp(QMainWindow):
         # Transitions
         hbox_render.addWidget(QLabel("Transition:"))
         self.combo_trans = QComboBox()
-        self.combo_trans.addItems(["None", "Fade Black", "Fade White"])
+        self.combo_trans.addItems(list(TRANSITIONS))
         hbox_render.addWidget(self.combo_trans)
 
+        # Parallel chunk encodes
+        hbox_render.addWidget(QLabel("Parallel Jobs:"))
+        self.spin_workers = QSpinBox()
+        self.spin_workers.setRange(1, max(1, os.cpu_count() or 1))
+        self.spin_workers.setValue(default_chunk_workers())
+        hbox_render.addWidget(self.spin_workers)
+
+        self.chk_chunk_cache = QCheckBox("Reuse Cached Clips")
+        self.chk_chunk_cache.setChecked(True)
+        hbox_render.addWidget(self.chk_chunk_cache)
+
+        # Assembly Engine
+        hbox_render.addWidget(QLabel("Engine:"))
+        self.combo_engine = QComboBox()
+        self.combo_engine.addItem("Chunked", "chunked")
+        self.combo_engine.addItem("Single Pass", "single_pass")
+        self.combo_engine.currentIndexChanged.connect(
+            lambda _: self.chk_chunk_cache.setEnabled(self.combo_engine.currentData() == "chunked"))
+        hbox_render.addWidget(self.combo_engine)
+
         layout.addWidget(gb_render)
         
         hbox_action = QHBoxLayout()
         self.btn_assemble = QPushButton("🎬 Render Final Video")
         self.btn_assemble.setStyleSheet("background-color: #E91E63; font-size: 14px; font-weight: bold; padding: 10px;")
         self.btn_assemble.clicked.connect(self.run_assembly)
+        self.btn_queue = QPushButton("➕ Add to Queue")
+        self.btn_queue.setStyleSheet("font-size: 14px; font-weight: bold; padding: 10px;")
+        self.btn_queue.clicked.connect(self.queue_assembly)
         hbox_action.addStretch()
+        hbox_action.addWidget(self.btn_queue)
         hbox_action.addWidget(self.btn_assemble)
         layout.addLayout(hbox_action)
+
+        # Render Queue
+        gb_queue = QGroupBox("Render Queue")
+        vbox_queue = QVBoxLayout(gb_queue)
+        self.queue_table = QTableWidget(0, 4)
+        self.queue_table.setHorizontalHeaderLabels(["Project", "Priority", "Status", "Progress"])
+        self.queue_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.queue_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.queue_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.queue_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.queue_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.queue_table.verticalHeader().setVisible(False)
+        self.queue_table.setMaximumHeight(160)
+        vbox_queue.addWidget(self.queue_table)
+
+        hbox_queue = QHBoxLayout()
+        for text, handler in [("▲ Priority", lambda: self.change_queue_priority(1)),
+                              ("▼ Priority", lambda: self.change_queue_priority(-1)),
+                              ("Pause", lambda: self.queue_command(self.render_queue.pause)),
+                              ("Resume", lambda: self.queue_command(self.render_queue.resume)),
+                              ("Cancel", lambda: self.queue_command(self.render_queue.cancel)),
+                              ("Remove", lambda: self.queue_command(self.render_queue.remove))]:
+            btn = QPushButton(text)
+            btn.clicked.connect(handler)
+            hbox_queue.addWidget(btn)
+        hbox_queue.addStretch()
+
+        self.chk_queue_hold = QCheckBox("Hold Queue")
+        self.chk_queue_hold.setChecked(self.render_queue.held)
+        self.chk_queue_hold.toggled.connect(self.render_queue.set_held)
+        hbox_queue.addWidget(self.chk_queue_hold)
+
+        hbox_queue.addWidget(QLabel("Concurrent Renders:"))
+        self.spin_queue_slots = QSpinBox()
+        self.spin_queue_slots.setRange(1, max(1, os.cpu_count() or 1))
+        self.spin_queue_slots.setValue(self.render_queue.slots)
+        self.spin_queue_slots.valueChanged.connect(self.render_queue.set_slots)
+        hbox_queue.addWidget(self.spin_queue_slots)
+        vbox_queue.addLayout(hbox_queue)
+        layout.addWidget(gb_queue)
         
         self.tabs.addTab(tab, "3. Finishing")
     
@@ -925,39 +1219,41 @@ class VideoToolsApp(QMainWindow):
         paths, _ = QFileDialog.getOpenFileNames(self, "Select Videos in Batch", "", "Video Files (*.mp4 *.mov *.avi)")
         if not paths: return
         
-        import re
-        # Relaxed Regex: Find ANY leading number or number sequence
-        # Old: ^\s*(\d+)
-        # New: Search for (\d+) and use the first match.
-        
-        parsed_files = []
-        for p in paths:
-            fname = os.path.basename(p)
-            match = re.search(r"(\d+)", fname)
-            if match:
-                num = int(match.group(1))
-                parsed_files.append((num, p))
-            else:
-                print(f"DEBUG: Skipping batch file (no number found): {fname}")
-        
-        # Sort by number
-        parsed_files.sort(key=lambda x: x[0])
+        # First number in each file name -> 1-based row (frame 1 -> video 01)
+        assignments, skipped = match_videos_to_rows(paths, self.clip_table.rowCount())
+        for fname in skipped:
+            print(f"DEBUG: Skipping batch file (no number found): {fname}")
         
-        if not parsed_files:
+        if len(skipped) == len(paths):
             QMessageBox.warning(self, "No Match", "No numbers found in filenames to sort by.")
             return
-            
-        # Assign to rows
-        count = 0
-        for num, deep_path in parsed_files:
-            # num indicates the 1-based index (usually) or raw number.
-            # User wants: frame 1 -> video 01. So index = num - 1.
-            row_idx = num - 1 
-            if 0 <= row_idx < self.clip_table.rowCount():
-                self.clip_table.set_video_for_row(row_idx, deep_path)
-                count += 1
-        
-        QMessageBox.information(self, "Batch Complete", f"Assigned {count} videos based on detected numbers.")
+
+        if not assignments:
+            QMessageBox.information(self, "Batch Complete", "Assigned 0 videos based on detected numbers.")
+            return
+
+        # Probe/thumbnail off the GUI thread; rows update as each result arrives
+        self.batch_dialog = QProgressDialog("Assigning videos...", "Cancel", 0, len(assignments), self)
+        self.batch_dialog.setWindowTitle("Batch Upload")
+        self.batch_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.batch_dialog.setMinimumDuration(0)
+        self.batch_dialog.setValue(0)
+
+        self.batch_worker = BatchAssignWorker(assignments)
+        self.batch_worker.row_ready.connect(self.clip_table.apply_video_to_row)
+        self.batch_worker.progress_signal.connect(self.on_batch_progress)
+        self.batch_worker.finished_signal.connect(self.on_batch_done)
+        self.batch_dialog.canceled.connect(self.batch_worker.cancel)
+        self.batch_worker.start()
+
+    def on_batch_progress(self, current, total, msg):
+        self.batch_dialog.setValue(current)
+        self.batch_dialog.setLabelText(msg)
+
+    def on_batch_done(self, count, cancelled):
+        self.batch_dialog.close()
+        title = "Batch Cancelled" if cancelled else "Batch Complete"
+        QMessageBox.information(self, title, f"Assigned {count} videos based on detected numbers.")
         self.save_finishing_state()
 
     def save_finishing_state(self):
@@ -978,7 +1274,7 @@ class VideoToolsApp(QMainWindow):
         slides_dir = os.path.normpath(slides_dir)
         try:
             # Flexible filter: accept frame_*.png OR slide_*.png
-            files = sorted([f for f in os.listdir(slides_dir) if (f.startswith("frame_") or f.startswith("slide_")) and f.lower().endswith(".png")])
+            files = list_slide_files(slides_dir)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to list frames:\n{e}")
             return
@@ -989,20 +1285,8 @@ class VideoToolsApp(QMainWindow):
 
         self.clip_table.setRowCount(len(files))
         
-        # 2. Parse Timestamps
-        t_stamps = []
-        for f in files:
-            # Try to parse: frame_0001__01-23-456.png
-            try:
-                if "__" in f:
-                    part = f.split("__")[1].split(".")[0] # 01-23-456
-                    mins, secs, mills = map(int, part.split("-"))
-                    total_sec = (mins * 60) + secs + (mills / 1000.0)
-                    t_stamps.append(total_sec)
-                else:
-                    t_stamps.append(-1.0) # Marker: No timestamp in filename
-            except:
-                t_stamps.append(-1.0)
+        # 2. Timestamps + target durations (estimated where the name has none)
+        timeline = slide_timeline(files)
 
         # Load Saved Mapping for restoration
         saved_map = {}
@@ -1019,19 +1303,7 @@ class VideoToolsApp(QMainWindow):
             item_thumb.setData(Qt.ItemDataRole.UserRole, path)
             self.clip_table.setItem(r, 0, item_thumb)
             
-            # --- Timestamp Fallback Logic ---
-            ts_val = t_stamps[r]
-            if ts_val < 0:
-                # If timestamp is missing (-1.0), estimate it!
-                if r == 0:
-                    ts_val = 0.0
-                else:
-                    # Use previous timestamp + 5.0 seconds
-                    prev = t_stamps[r-1]
-                    if prev < 0: prev = 0.0 # safety
-                    ts_val = prev + 5.0
-                # Update t_stamps array for future iterations
-                t_stamps[r] = ts_val
+            ts_val, dur = timeline[r]
 
             # B. Timestamp Display
             mins = int(ts_val // 60)
@@ -1039,17 +1311,7 @@ class VideoToolsApp(QMainWindow):
             millis = int((ts_val * 1000) % 1000)
             self.clip_table.setItem(r, 1, QTableWidgetItem(f"{mins:02d}:{secs:02d}.{millis:03d}"))
             
-            # C. Target Duration Calculation
-            if r < len(files) - 1:
-                next_raw = t_stamps[r+1]
-                if next_raw < 0: 
-                    # Next one is invalid, so just assume 5.0s diff
-                    dur = 5.0
-                else:
-                    dur = max(1.0, next_raw - ts_val)
-            else:
-                dur = 5.0 # Last slide default
-            
+            # C. Target Duration
             item_dur = QTableWidgetItem(f"{dur:.1f}s")
             item_dur.setData(Qt.ItemDataRole.UserRole, dur)
             item_dur.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -1077,10 +1339,11 @@ class VideoToolsApp(QMainWindow):
         self.clip_table.setItem(row, 4, QTableWidgetItem("-"))
         self.save_finishing_state()
 
-    def run_assembly(self):
+    def collect_assembly_job(self):
+        """ Table + render options -> (clip_data, output, mix_settings), or None if incomplete """
         clip_data = []
         rows = self.clip_table.rowCount()
-        if rows == 0: return
+        if rows == 0: return None
 
         for i in range(rows):
             # Video
@@ -1100,7 +1363,7 @@ class VideoToolsApp(QMainWindow):
                     pass 
                 else:
                     QMessageBox.warning(self, "Missing Video", f"Row {i+1} has no video assigned and Auto-Zoom is unavailable.")
-                    return
+                    return None
             
             # Target Dur
             item_target = self.clip_table.item(i, 2)
@@ -1129,21 +1392,91 @@ class VideoToolsApp(QMainWindow):
             "generated_vol": self.slider_vol.value() / 100.0,
             "zoom_amount": self.spin_zoom.value(),
             "audio_norm": self.chk_norm.isChecked(),
-            "transition": self.combo_trans.currentText()
+            "transition": self.combo_trans.currentText(),
+            "chunk_workers": self.spin_workers.value(),
+            "use_chunk_cache": self.chk_chunk_cache.isChecked(),
+            "engine": self.combo_engine.currentData()
         }
         if mix_settings["enabled"] and not self.current_video_path:
              # Just a safety check
              mix_settings["enabled"] = False
+        return clip_data, output, mix_settings
+
+    def run_assembly(self):
+        job = self.collect_assembly_job()
+        if not job: return
+        clip_data, output, mix_settings = job
         
         self.assembly_worker = AssemblyWorker(clip_data, output, mix_settings)
-        self.assembly_worker.progress_signal.connect(lambda a, b, msg: self.status_label.setText(msg)) # Simple status update
+        self.assembly_worker.progress_signal.connect(self.on_assembly_progress)
+        self.assembly_worker.encode_progress.connect(self.on_encode_progress)
         self.assembly_worker.finished_signal.connect(self.on_assembly_done)
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
+        self.progress.show()
         
         self.btn_assemble.setEnabled(False)
         self.assembly_worker.start()
 
+    def queue_assembly(self):
+        job = self.collect_assembly_job()
+        if not job: return
+        clip_data, output, mix_settings = job
+        name = os.path.basename(self.current_video_path) or os.path.basename(os.path.dirname(output))
+        self.render_queue.add(name, clip_data, output, mix_settings)
+        self.status_label.setText(f"Queued render: {name}")
+
+    def selected_queue_job(self):
+        row = self.queue_table.currentRow()
+        item = self.queue_table.item(row, 0) if row >= 0 else None
+        return item.data(Qt.ItemDataRole.UserRole) if item else None
+
+    def queue_command(self, command):
+        job_id = self.selected_queue_job()
+        if job_id: command(job_id)
+
+    def change_queue_priority(self, delta):
+        job = self.render_queue.get(self.selected_queue_job() or "")
+        if job: self.render_queue.set_priority(job["id"], job["priority"] + delta)
+
+    def refresh_queue_table(self, changed_id=""):
+        """ Redraws the queue; the selection follows its job when the order changes """
+        selected = self.selected_queue_job()
+        jobs = self.render_queue.jobs()
+        self.queue_table.setRowCount(len(jobs))
+        for r, job in enumerate(jobs):
+            item_name = QTableWidgetItem(job["name"])
+            item_name.setData(Qt.ItemDataRole.UserRole, job["id"])
+            item_name.setToolTip(job["output_path"])
+            self.queue_table.setItem(r, 0, item_name)
+            self.queue_table.setItem(r, 1, QTableWidgetItem(str(job["priority"])))
+
+            status = job["status"].capitalize()
+            if job["status"] == RUNNING and job["step"]:
+                status = job["step"]
+            elif job["error"].strip():
+                status = "Failed: " + job["error"].strip().splitlines()[-1]
+            item_status = QTableWidgetItem(status)
+            item_status.setToolTip(job["error"] or job["result"])
+            self.queue_table.setItem(r, 2, item_status)
+            progress = f"{job['progress']:.0f}%" if job["status"] in (RUNNING,) + FINISHED_STATES else ""
+            self.queue_table.setItem(r, 3, QTableWidgetItem(progress))
+            if job["id"] == selected:
+                self.queue_table.selectRow(r)
+
+    def on_assembly_progress(self, current, total, msg):
+        self.current_step_msg = msg
+        self.status_label.setText(msg)
+
+    def on_encode_progress(self, percent, fps, speed):
+        # Live ffmpeg stats: a stalled encode shows up as a frozen percent / 0.00x speed
+        self.progress.setRange(0, 100)
+        self.progress.setValue(int(percent))
+        self.status_label.setText(f"{self.current_step_msg} {percent:.0f}% | {fps:.0f} fps | {speed:.2f}x")
+
     def on_assembly_done(self, success, result):
         self.btn_assemble.setEnabled(True)
+        self.progress.hide()
         self.status_label.setText("Ready")
         if success:
             QMessageBox.information(self, "Success", f"Video assembled!\nSaved to: {result}")
@@ -1195,25 +1528,26 @@ class VideoToolsApp(QMainWindow):
             os.environ["PATH"] += os.pathsep + bundled_ffmpeg
             print(f"Added bundled FFmpeg to PATH: {bundled_ffmpeg}")
 
-        # 2. Verify availability
-        try:
-            subprocess.run(["ffmpeg", "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **get_subprocess_kwargs())
-        except FileNotFoundError:
+        # 2. Verify availability off the GUI thread (cached per binary) so the window opens at once
+        self.caps_notifier = CapabilityNotifier()
+        self.caps_notifier.ready.connect(self.on_ffmpeg_caps)
+        start_capability_probe(self.caps_notifier.ready.emit)
+
+    def on_ffmpeg_caps(self, caps):
+        if not caps.available:
             QMessageBox.critical(self, "FFmpeg Missing", 
                 "FFmpeg is not found.\n\n"
                 "Please install FFmpeg or ensure the 'ffmpeg' folder is in the app directory."
             )
+            return
+        print(f"DEBUG: FFmpeg {caps.version}: H.264 via {caps.h264_encoder()}, {len(caps.filters)} filters")
 
     def generate_thumbnail(self, video_path):
-        temp_thumb = os.path.join(os.path.dirname(video_path), ".temp_thumb.jpg")
         try:
-            cmd = ["ffmpeg", "-ss", "00:00:01", "-i", video_path, "-vframes", "1", "-vf", "scale=160:-1", temp_thumb, "-y"]
-            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **get_subprocess_kwargs())
-            if os.path.exists(temp_thumb):
-                pix = QPixmap(temp_thumb)
+            data = get_video_thumbnail(video_path, vf="scale=160:-1")
+            pix = QPixmap()
+            if data and pix.loadFromData(data):
                 self.thumb_label.setPixmap(pix.scaled(80, 50, Qt.AspectRatioMode.KeepAspectRatioByExpanding, Qt.TransformationMode.SmoothTransformation))
-                try: os.remove(temp_thumb)
-                except: pass
             else:
                 self.thumb_label.setText("No Img")
         except FileNotFoundError:
@@ -1222,62 +1556,137 @@ class VideoToolsApp(QMainWindow):
             print(f"Thumb error: {e}")
 
     def get_video_duration(self, path):
-        cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", path]
         try:
-            res = subprocess.run(cmd, stdout=subprocess.PIPE, text=True, **get_subprocess_kwargs())
-            self.video_duration = float(res.stdout.strip())
+            self.video_duration = get_probe_cache().get_duration(path)
         except FileNotFoundError:
             self.video_duration = 0.0
             QMessageBox.warning(self, "FFmpeg Error", "Could not get video duration (FFmpeg/FFprobe missing).")
         except Exception: 
             self.video_duration = 0.0
 
+    def collect_prepare_options(self):
+        """ Prepare tab settings as batch_prepare options (None after showing a warning) """
+        trim = None
+        if self.chk_trim.isChecked():
+            try:
+                trim = float(self.trim_seconds_input.text())
+            except ValueError:
+                QMessageBox.warning(self, "Trim Error", "Invalid trim duration.")
+                return None
+        logo_width = None
+        if self.wm_width.text().strip():
+            try:
+                logo_width = int(self.wm_width.text())
+                if logo_width <= 0: raise ValueError
+            except ValueError:
+                QMessageBox.warning(self, "Watermark Error", "Logo width must be a positive number of pixels.")
+                return None
+        return {
+            "logo": self.logo_path_input.text() or None, "x": self.wm_x.text(), "y": self.wm_y.text(),
+            "logo_width": logo_width, "speed": self.combo_encode_speed.currentData(), "trim": trim,
+            "stream_copy": self.chk_stream_copy.isChecked(), "accurate_trim": self.chk_accurate_trim.isChecked(),
+        }
+
     def run_process(self):
         if not self.current_video_path: return
-        base, ext = os.path.splitext(self.current_video_path)
-        output_path = f"{base}_processed{ext}"
-        cmd = ["ffmpeg", "-i", self.current_video_path]
-        logo = self.logo_path_input.text()
-        has_logo = os.path.exists(logo)
-        if has_logo:
-             cmd.extend(["-i", logo])
-        if has_logo:
-             cmd.extend(["-filter_complex", f"overlay={self.wm_x.text()}:{self.wm_y.text()}"])
-        if self.chk_trim.isChecked():
+        options = self.collect_prepare_options()
+        if options is None: return
+        output_path = prepared_output_path(self.current_video_path)
+        out_dur = self.video_duration
+        if options["trim"] is not None:
+            # Safety Check: Ensure we have duration
+            if self.video_duration <= 0:
+                 self.get_video_duration(self.current_video_path)
             try:
-                # Safety Check: Ensure we have duration
-                if self.video_duration <= 0:
-                     self.get_video_duration(self.current_video_path)
-                     
-                cut_sec = float(self.trim_seconds_input.text())
-                new_dur = max(1.0, self.video_duration - cut_sec) # Ensure at least 1s
-                cmd.extend(["-t", str(new_dur)])
-            except: 
+                out_dur = trimmed_duration(self.video_duration, options["trim"])
+            except ValueError:
                 QMessageBox.warning(self, "Trim Error", "Invalid trim duration or video length unknown.")
                 return
-        cmd.extend(["-c:v", "libx264", "-c:a", "copy", output_path, "-y"])
-        self.start_ffmpeg_worker(cmd, 'process', output_path)
+        worker = PrepareWorker(self.current_video_path, output_path, options["logo"],
+                               options["x"], options["y"], options["trim"], self.video_duration,
+                               options["stream_copy"], options["accurate_trim"],
+                               options["logo_width"], options["speed"])
+        self.start_worker(worker, output_path, out_dur > 0)
+
+    def run_batch_prepare(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder of Source Videos")
+        if not folder: return
+        videos = list_source_videos([folder])
+        if not videos:
+            QMessageBox.information(self, "Batch Prepare", "No source videos in that folder.")
+            return
+        options = self.collect_prepare_options()
+        if options is None: return
+
+        self.batch_table.setRowCount(len(videos))
+        for r, path in enumerate(videos):
+            self.batch_table.setItem(r, 0, QTableWidgetItem(os.path.basename(path)))
+            self.batch_table.setItem(r, 1, QTableWidgetItem("Queued"))
+            self.batch_table.setItem(r, 2, QTableWidgetItem(""))
+        self.lbl_batch_summary.setText(f"Preparing {len(videos)} videos...")
+        self.btn_batch_prepare.setEnabled(False)
+        self.btn_batch_cancel.setEnabled(True)
+
+        self.batch_prepare_worker = BatchPrepareWorker(videos, options, folder, self.spin_batch_workers.value())
+        self.batch_prepare_worker.file_progress.connect(self.on_batch_file_progress)
+        self.batch_prepare_worker.file_done.connect(self.on_batch_file_done)
+        self.batch_prepare_worker.finished_signal.connect(self.on_batch_prepare_done)
+        self.batch_prepare_worker.start()
+
+    def cancel_batch_prepare(self):
+        if getattr(self, 'batch_prepare_worker', None):
+            self.batch_prepare_worker.cancel()
+            self.btn_batch_cancel.setEnabled(False)
+            self.lbl_batch_summary.setText("Cancelling...")
+
+    def on_batch_file_progress(self, row, percent):
+        self.batch_table.setItem(row, 1, QTableWidgetItem("Running"))
+        self.batch_table.setItem(row, 2, QTableWidgetItem(f"{percent:.0f}%"))
+
+    def on_batch_file_done(self, row, result):
+        item_status = QTableWidgetItem(result["status"].capitalize())
+        if result["status"] == FAILED:
+            item_status.setForeground(QColor("#F44336"))
+            item_status.setToolTip(result["error"])
+        self.batch_table.setItem(row, 1, item_status)
+        detail = f"{result['seconds']:.1f}s" if result["status"] == DONE else ""
+        self.batch_table.setItem(row, 2, QTableWidgetItem(detail))
+
+    def on_batch_prepare_done(self, summary, report_path):
+        self.btn_batch_prepare.setEnabled(True)
+        self.btn_batch_cancel.setEnabled(False)
+        text = format_batch_summary(summary)
+        if report_path:
+            text += f"\nReport: {report_path}"
+        self.lbl_batch_summary.setText(text)
+        self.batch_prepare_worker = None
 
     def run_extract(self):
         if not self.current_video_path: return
         video_dir = os.path.dirname(self.current_video_path)
-        output_pattern = os.path.join(video_dir, "slide_%04d.png")
-        
-        # FIX: Removed :file=/dev/stderr (incompatible with Windows). 
-        # metadata=print automatically prints to stderr, which we capture.
-        cmd = ["ffmpeg", "-i", self.current_video_path, "-vf", "select='eq(n,0)+gt(scene,0.12)',metadata=print", "-vsync", "vfr", output_pattern, "-y"]
-        self.start_ffmpeg_worker(cmd, 'extract', video_dir)
-
-    def start_ffmpeg_worker(self, cmd, task_type, expected_output):
+        mode = self.combo_extract_mode.currentData()
+        worker = ExtractWorker(self.current_video_path, video_dir, mode, self.video_duration)
+        # Full decode reports each slide as soon as it is written: fill the gallery live
+        self.gallery_model.set_images([])
+        worker.slide_found.connect(lambda path, ts, score: self.gallery_model.add_image(path))
+        self.start_worker(worker, video_dir, self.video_duration > 0)
+
+    def start_worker(self, worker, expected_output, track_progress=True):
+        """ Runs a prepare/extract worker (PrepareWorker signal shape) and routes it to on_ffmpeg_done """
+        # Indeterminate until the first progress block arrives (or for unknown durations)
         self.progress.setRange(0, 0)
         self.progress.show()
         self.current_task_output = expected_output 
-        self.worker = FFmpegWorker(cmd, task_type)
+        self.current_step_msg = "Processing..." if worker.task_type == 'process' else "Extracting..."
+        self.worker = worker
         self.worker.finished.connect(self.on_ffmpeg_done)
+        if track_progress:
+            self.worker.encode_progress.connect(self.on_encode_progress)
         self.worker.start()
 
     def on_ffmpeg_done(self, success, msg, output_log):
         self.progress.hide()
+        self.status_label.setText("Ready")
         if success:
             if self.worker.task_type == 'process':
                 msg_box = QMessageBox(self)
@@ -1297,94 +1706,48 @@ class VideoToolsApp(QMainWindow):
                     self.tabs.setCurrentIndex(1)
             elif self.worker.task_type == 'extract':
                 if os.path.isdir(self.current_task_output):
-                    # --- TIMESTAMP PROCESSING START ---
-                    try:
-                        import re
-                        # 1. Parse timestamps from stderr log
-                        # Format in log: "pts_time:12.345678"
-                        timestamps = re.findall(r'pts_time:([0-9\.]+)', output_log)
-                        
-                        # 2. Get generated files (sorted)
-                        directory = self.current_task_output
-                        files = sorted([f for f in os.listdir(directory) if f.startswith("slide_") and f.endswith(".png")])
-                        
-                        # 3. Rename loop
-                        renamed_count = 0
-                        for i, filename in enumerate(files):
-                            if i < len(timestamps):
-                                ts_float = float(timestamps[i])
-                                # Calculate MM-SS-mmm
-                                minutes = int(ts_float // 60)
-                                seconds = int(ts_float % 60)
-                                millis = int((ts_float * 1000) % 1000)
-                                ts_str = f"{minutes:02d}-{seconds:02d}-{millis:03d}"
-                                
-                                new_name = f"frame_{i+1:04d}__{ts_str}.png"
-                                old_path = os.path.join(directory, filename)
-                                new_path = os.path.join(directory, new_name)
-                                os.rename(old_path, new_path)
-                                renamed_count += 1
-                        
-                        print(f"DEBUG: Renamed {renamed_count} files with timestamps.")
-                        
-                    except Exception as e:
-                        print(f"Error processing timestamps: {e}")
-                    # --- TIMESTAMP PROCESSING END ---
-
-                    self.load_gallery(self.current_task_output)
-                    QMessageBox.information(self, "Success", "Slides extracted with timestamps!")
-                    open_file_native(self.current_task_output)
+                    self.finish_extract(self.current_task_output)
         else:
             QMessageBox.critical(self, "Error", msg)
 
+    def finish_extract(self, directory):
+        """ Optional near-duplicate merge (off the GUI thread), then show the slides """
+        if not self.chk_dedup.isChecked():
+            self.on_extract_ready(directory, "")
+            return
+        self.progress.setRange(0, 0)
+        self.progress.show()
+        self.status_label.setText("Merging near-duplicate slides...")
+        self.dedup_worker = DedupWorker(directory)
+        self.dedup_worker.finished_signal.connect(self.on_extract_ready)
+        self.dedup_worker.start()
+
+    def on_extract_ready(self, directory, note):
+        self.progress.hide()
+        self.status_label.setText("Ready")
+        self.load_gallery(directory)
+        QMessageBox.information(self, "Success", "Slides extracted with timestamps!" + (f"\n{note}" if note else ""))
+        open_file_native(directory)
+
     def load_gallery(self, directory):
         self.slides_dir = directory
         # self.save_state()
         
-        for i in reversed(range(self.results_grid.count())): 
-            self.results_grid.itemAt(i).widget().setParent(None)
-           # Support loading from folder even if images aren't named "slide_" if imported manually
-        self.image_widgets = []
+        # Support loading from folder even if images aren't named "slide_" if imported manually
         images = sorted([f for f in os.listdir(directory) if f.lower().endswith(('.png', '.jpg', '.jpeg'))])
-        if not images: return
-        row, col = 0, 0
-        self.current_gallery_images = [os.path.join(directory, img) for img in images] 
-        for idx, img_file in enumerate(images):
-            abs_path = os.path.join(directory, img_file)
-            widget = SelectableImageWidget(abs_path)
-            
-            # --- PARSE TIMESTAMP FOR UI ---
-            # Expected format: frame_0001__01-23-456.png
-            if "__" in img_file:
-                try:
-                    # extract 01-23-456.png
-                    parts = img_file.split("__")
-                    if len(parts) > 1:
-                        ts_part = parts[1].split(".")[0] # 01-23-456
-                        # Convert to 01:23.456
-                        formatted = ts_part.replace("-", ":", 1).replace("-", ".", 1)
-                        widget.set_timestamp(formatted)
-                except: pass
-            # ------------------------------
-
-            widget.thumb_label.clicked.connect(lambda i=idx: self.open_lightbox(i))
-            self.results_grid.addWidget(widget, row, col)
-            self.image_widgets.append(widget)
-            col += 1
-            if col >= 4:
-                col = 0
-                row += 1
+        self.gallery_model.set_images([os.path.join(directory, img) for img in images])
 
     def open_lightbox(self, index):
-        if not self.current_gallery_images: return
-        dlg = LightboxDialog(self.current_gallery_images, index, self)
+        paths = self.gallery_model.paths()
+        if not paths: return
+        dlg = LightboxDialog(paths, index, self)
         dlg.exec()
 
     def set_all_selected(self, selected):
-        for w in self.image_widgets: w.checkbox.setChecked(selected)
+        self.gallery_model.set_all_checked(selected)
 
     def send_to_ai_tab(self):
-        selected_paths = [w.image_path for w in self.image_widgets if w.checkbox.isChecked()]
+        selected_paths = self.gallery_model.checked_paths()
         if not selected_paths:
             QMessageBox.warning(self, "No Images", "Please select at least one image.")
             return
@@ -1410,9 +1773,11 @@ class VideoToolsApp(QMainWindow):
         prompt = self.prompt_text.toPlainText()
         duration = self.combo_dur.currentText()
 
+        self.generated_assignments = []
         self.v_worker = VertexWorker(self.vertex_key_path, self.target_images, model, prompt, duration)
         self.v_worker.progress_signal.connect(self.on_vertex_progress)
         self.v_worker.video_generated.connect(self.add_video_result)
+        self.v_worker.video_generated.connect(self.collect_generated_video)
         self.v_worker.finished_signal.connect(self.on_vertex_finished)
         self.v_worker.start()
 
@@ -1434,9 +1799,24 @@ class VideoToolsApp(QMainWindow):
         hbox.addWidget(btn_show)
         self.v_results_layout.addWidget(wid)
 
+    def collect_generated_video(self, video_path):
+        """ A generated clip keeps its slide's base name: find that slide's row """
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        for row in range(self.clip_table.rowCount()):
+            item = self.clip_table.item(row, 0)
+            frame_path = item.data(Qt.ItemDataRole.UserRole) if item else None
+            if frame_path and os.path.splitext(os.path.basename(frame_path))[0] == stem:
+                self.generated_assignments.append((row, video_path))
+                return
+
     def on_vertex_finished(self, success, msg):
         self.btn_generate.setEnabled(True)
         self.progress.hide()
+        if self.generated_assignments:
+            # Fill the matching table rows (probe + thumbnail off the GUI thread)
+            self.generated_assign_worker = BatchAssignWorker(self.generated_assignments)
+            self.generated_assign_worker.row_ready.connect(self.clip_table.apply_video_to_row)
+            self.generated_assign_worker.start()
         if success:
             QMessageBox.information(self, "Batch Complete", "All videos processed!")
         else:
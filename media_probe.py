@@ -0,0 +1,96 @@
+import os
+import json
+import sqlite3
+import threading
+import subprocess
+from collections import OrderedDict
+
+from ffmpeg_utils import get_subprocess_kwargs
+from cache_utils import get_cache_dir, file_identity
+
+MEMORY_ENTRIES = 512
+
+
+class MediaProbeCache:
+    """
+    One `ffprobe -show_format -show_streams -of json` per file, ever.
+    Results are keyed by (path, size, mtime), kept in an in-memory LRU and
+    persisted to a SQLite index so they survive restarts. Thread-safe.
+    """
+    def __init__(self, db_path=None, memory_entries=MEMORY_ENTRIES):
+        self.db_path = db_path or os.path.join(get_cache_dir("probe"), "probe.sqlite")
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS probe (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, data TEXT)")
+        self._db.commit()
+
+    def probe(self, path):
+        """ Parsed ffprobe JSON for path, or None if the file can't be probed """
+        try:
+            abs_path, size, mtime = file_identity(path)
+        except OSError:
+            return None
+        key = (abs_path, size, mtime)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            row = self._db.execute("SELECT size, mtime, data FROM probe WHERE path=?", (abs_path,)).fetchone()
+        if row and row[0] == size and row[1] == mtime:
+            info = json.loads(row[2])
+        else:
+            info = self._run_ffprobe(abs_path) # FileNotFoundError propagates: ffprobe missing
+            if info is None:
+                return None
+            with self._lock:
+                self._db.execute("INSERT OR REPLACE INTO probe VALUES (?, ?, ?, ?)", (abs_path, size, mtime, json.dumps(info)))
+                self._db.commit()
+
+        with self._lock:
+            self._memory[key] = info
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return info
+
+    def _run_ffprobe(self, path):
+        cmd = ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", path]
+        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding="utf-8", errors="replace", **get_subprocess_kwargs())
+        if res.returncode != 0:
+            return None
+        try:
+            return json.loads(res.stdout)
+        except ValueError:
+            return None
+
+    def get_duration(self, path):
+        """ Container duration in seconds (0.0 if unknown) """
+        info = self.probe(path)
+        try:
+            return float(info["format"]["duration"])
+        except (TypeError, KeyError, ValueError):
+            return 0.0
+
+    def video_stream(self, path):
+        """ First video stream dict of the probe (None if there is none) """
+        info = self.probe(path) or {}
+        return next((s for s in info.get("streams", []) if s.get("codec_type") == "video"), None)
+
+    def has_audio(self, path):
+        info = self.probe(path)
+        return bool(info) and any(s.get("codec_type") == "audio" for s in info.get("streams", []))
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_probe_cache():
+    """ Process-wide MediaProbeCache shared by the widgets and workers """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = MediaProbeCache()
+        return _shared
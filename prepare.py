@@ -0,0 +1,342 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import subprocess
+
+from PIL import Image
+
+from ffmpeg_utils import get_subprocess_kwargs, run_ffmpeg
+from ffmpeg_caps import get_capabilities
+from media_probe import get_probe_cache
+from cache_utils import DiskLRUCache, get_cache_dir, file_identity, make_cache_key
+
+PROCESSED_SUFFIX = "_processed" # Output name marker; batch folder scans skip these files
+
+KEYFRAME_SEARCH_WINDOW = 30.0 # Seconds before the cut scanned for its keyframe (packets only, no decode)
+MIN_REENCODE = 0.02 # A cut closer than this to its keyframe needs no re-encoded tail
+
+# Source codec -> encoders able to produce a tail that concatenates with copied packets
+TAIL_ENCODERS = {"h264": ("libx264", "h264_videotoolbox", "h264_nvenc", "h264_qsv"), "hevc": ("libx265", "hevc_videotoolbox", "hevc_nvenc")}
+
+# libx264 presets, fastest first: (preset, throughput relative to 'medium', CRF).
+# Faster presets compress worse, so their CRF is lowered a little to hold quality.
+X264_PROFILES = (
+    ("ultrafast", 7.0, 20), ("superfast", 5.0, 21), ("veryfast", 3.2, 22),
+    ("faster", 2.0, 22), ("fast", 1.4, 23), ("medium", 1.0, 23),
+)
+# 'medium' pixels/s per encoder thread (~7 fps of 1080p) until a finished encode measures it
+DEFAULT_PIXEL_RATE = 14e6
+SPEED_HEADROOM = 1.1 # Aim a little above the target: decode and overlay share the CPU
+MIN_MEASURE_SECONDS = 10.0 # Shorter encodes are dominated by startup and don't update the rate
+
+LOGO_CACHE_VERSION = 1
+LOGO_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+_stats_lock = threading.Lock()
+
+
+def prepared_output_path(video_path):
+    """ 'talk.mp4' -> 'talk_processed.mp4' next to the source """
+    base, ext = os.path.splitext(video_path)
+    return f"{base}{PROCESSED_SUFFIX}{ext}"
+
+
+def trimmed_duration(duration, trim_seconds):
+    """ Length left after cutting trim_seconds off the end (at least 1s); needs a known duration """
+    if duration <= 0:
+        raise ValueError("Video length unknown; cannot trim.")
+    return max(1.0, duration - float(trim_seconds)) # Ensure at least 1s
+
+
+def default_encode_threads(concurrent_jobs=1):
+    """ Encoder threads when concurrent_jobs prepares share the machine """
+    return max(1, (os.cpu_count() or 1) // max(1, concurrent_jobs))
+
+
+def parse_frame_rate(rate):
+    """ '30000/1001' -> 29.97 (0.0 if unknown) """
+    try:
+        num, _, den = str(rate).partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _speed_stats_path():
+    return os.path.join(get_cache_dir("prepare"), "encode_speed.json")
+
+
+def _load_speed_stats():
+    try:
+        with open(_speed_stats_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_encode_speed(profile, speed):
+    """
+    Folds a finished encode's speed (x realtime) into the stored per-thread
+    'medium' rate for its encoder, so the next choice uses this machine's numbers.
+    """
+    if not profile.get("preset") or not profile.get("pixels") or speed <= 0:
+        return
+    rate = speed * profile["pixels"] / (profile["threads"] * profile["factor"])
+    with _stats_lock:
+        stats = _load_speed_stats()
+        old = stats.get(profile["encoder"])
+        stats[profile["encoder"]] = rate if not old else 0.5 * old + 0.5 * rate # One odd run mustn't swing it
+        path = _speed_stats_path()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(stats, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+
+def choose_encode_profile(video_path, target_speed=None, threads=None):
+    """
+    Encoder settings for the prepare encode. With a target_speed (x realtime, e.g. 4.0)
+    and libx264, picks the slowest (best compressing) preset whose estimated throughput
+    for this video's pixel rate still meets the target. Without one, the encoder defaults
+    are kept (the pre-existing output).
+    """
+    encoder = get_capabilities().h264_encoder()
+    profile = {"encoder": encoder, "preset": None, "crf": None, "threads": threads, "factor": 1.0, "pixels": 0.0}
+    if not target_speed or encoder != "libx264":
+        return profile # Hardware encoders are fast already and take different knobs
+
+    threads = profile["threads"] = threads or default_encode_threads()
+    stream = get_probe_cache().video_stream(video_path) or {}
+    fps = parse_frame_rate(stream.get("avg_frame_rate")) or parse_frame_rate(stream.get("r_frame_rate")) or 30.0
+    pixels = profile["pixels"] = float(stream.get("width") or 1920) * float(stream.get("height") or 1080) * fps
+
+    per_thread = float(_load_speed_stats().get(encoder) or DEFAULT_PIXEL_RATE)
+    needed = target_speed * pixels * SPEED_HEADROOM
+    preset, factor, crf = X264_PROFILES[0] # Nothing meets the target: fastest there is
+    for candidate in reversed(X264_PROFILES):
+        if per_thread * threads * candidate[1] >= needed:
+            preset, factor, crf = candidate
+            break
+    profile.update(preset=preset, crf=crf, factor=factor)
+    return profile
+
+
+def encode_args(profile=None):
+    """ Video encoder arguments for a choose_encode_profile() result """
+    if not profile:
+        return ["-c:v", get_capabilities().h264_encoder()]
+    args = ["-c:v", profile["encoder"]]
+    if profile.get("preset"):
+        args.extend(["-preset", profile["preset"], "-crf", str(profile["crf"])])
+    if profile.get("threads"):
+        args.extend(["-threads", str(profile["threads"])])
+    return args
+
+
+def logo_size(logo_path, width=None):
+    """ Overlay size of the logo: native, or width px wide keeping its aspect (reads the header only) """
+    with Image.open(logo_path) as img:
+        w, h = img.size
+    if width and int(width) != w:
+        return int(width), max(1, round(h * int(width) / w))
+    return w, h
+
+
+def cached_logo(logo_path, width=None):
+    """
+    The logo as raw RGBA at its overlay size: (path, (w, h)). Cached by the file's
+    identity, so a batch decodes and scales each PNG once and ffmpeg only reads bytes.
+    """
+    size = logo_size(logo_path, width)
+    cache = DiskLRUCache(get_cache_dir("logos"), LOGO_CACHE_MAX_BYTES, ".rgba")
+    key = make_cache_key("logo", LOGO_CACHE_VERSION, file_identity(logo_path), size)
+    path = cache.get(key)
+    if not path:
+        with Image.open(logo_path) as img:
+            img = img.convert("RGBA")
+            if img.size != size:
+                img = img.resize(size, Image.LANCZOS)
+            path = cache.put_bytes(key, img.tobytes())
+        cache.evict()
+    return path, size
+
+
+def build_prepare_command(video_path, output_path, logo_path=None, wm_x="0", wm_y="0", trim_seconds=None, duration=0.0,
+                          logo_width=None, profile=None):
+    """
+    Watermark overlay + optional tail trim in one encode. Returns (cmd, output duration).
+    trim_seconds cuts that much off the end (keeping at least 1s) and needs a known duration.
+    logo_width pre-scales the logo; profile comes from choose_encode_profile().
+    """
+    cmd = ["ffmpeg", "-i", video_path]
+    has_logo = bool(logo_path) and os.path.exists(logo_path)
+    if has_logo:
+        logo, (w, h) = cached_logo(logo_path, logo_width)
+        cmd.extend(["-f", "rawvideo", "-pix_fmt", "rgba", "-video_size", f"{w}x{h}", "-i", logo])
+        cmd.extend(["-filter_complex", f"overlay={wm_x}:{wm_y}"])
+    out_dur = duration
+    if trim_seconds is not None:
+        out_dur = trimmed_duration(duration, trim_seconds)
+        cmd.extend(["-t", str(out_dur)])
+    cmd.extend(encode_args(profile) + ["-c:a", "copy", output_path, "-y"])
+    return cmd, out_dur
+
+
+def build_copy_trim_command(video_path, output_path, out_dur=None):
+    """
+    Stream copy (no re-encode), optionally cut at out_dur. An end cut needs no
+    keyframe, but it ends on a packet boundary: with reordered B-frames the last
+    frame can be off by one or two (smart_trim is frame-exact).
+    """
+    cmd = ["ffmpeg", "-i", video_path, "-map", "0:v:0", "-map", "0:a?", "-c", "copy"]
+    if out_dur:
+        cmd.extend(["-t", f"{out_dur:.3f}"])
+    return cmd + ["-avoid_negative_ts", "make_zero", output_path, "-y"]
+
+
+def find_keyframe_before(video_path, t):
+    """ pts of the last video keyframe at/before t (None if it can't be determined) """
+    for start in (max(0.0, t - KEYFRAME_SEARCH_WINDOW), 0.0):
+        cmd = [
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-read_intervals", f"{start:.3f}%{t:.3f}",
+            "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", video_path
+        ]
+        try:
+            res = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                 text=True, **get_subprocess_kwargs())
+        except OSError:
+            return None
+        keyframes = []
+        for line in res.stdout.splitlines():
+            parts = line.strip().split(",")
+            if len(parts) >= 2 and "K" in parts[-1]:
+                try: keyframes.append(float(parts[0]))
+                except ValueError: pass
+        keyframes = [k for k in keyframes if k <= t]
+        if keyframes:
+            return max(keyframes)
+        if start == 0.0:
+            break
+    return None
+
+
+def tail_encoder(video_path):
+    """ (encoder, pix_fmt) for re-encoding a GOP that must join copied packets, or None """
+    stream = get_probe_cache().video_stream(video_path)
+    if not stream:
+        return None
+    caps = get_capabilities()
+    for name in TAIL_ENCODERS.get(stream.get("codec_name"), ()):
+        if name in caps.encoders or (not caps.encoders and name.startswith("lib")):
+            return name, stream.get("pix_fmt") or "yuv420p"
+    return None
+
+
+def smart_trim(video_path, output_path, out_dur, on_progress=None, cancel_event=None):
+    """
+    Frame-accurate end cut that only re-encodes from the last keyframe before the
+    cut: [0, K) is stream-copied, [K, cut) re-encoded, then both are joined and
+    muxed with the copied audio. Returns False when the source doesn't allow it
+    (unknown keyframes / codec), so the caller can fall back to a full encode.
+    """
+    keyframe = find_keyframe_before(video_path, out_dur)
+    encoder = tail_encoder(video_path)
+    if keyframe is None or encoder is None:
+        return False
+
+    def stage(offset, share):
+        def report(percent, fps, speed):
+            if on_progress: on_progress(offset + percent * share, fps, speed)
+        return report
+
+    if out_dur - keyframe < MIN_REENCODE:
+        # Cut already sits on a keyframe: plain copy is exact
+        returncode, err_tail = run_ffmpeg(build_copy_trim_command(video_path, output_path, keyframe),
+                                          out_dur, on_progress, cancel_event=cancel_event)
+        if returncode != 0:
+            raise RuntimeError(err_tail)
+        return True
+
+    # Work next to the output: same disk, so the final move is a rename
+    work_dir = tempfile.mkdtemp(prefix=".cut_", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        head = os.path.join(work_dir, "head_0.ts")
+        tail = os.path.join(work_dir, "tail.ts")
+        steps = []
+        if keyframe > 0:
+            # MPEG-TS parts carry their own parameter sets, so copied and encoded packets concatenate cleanly.
+            # -t can't end the head: copy checks it against decode times, and on a B-frame stream K decodes
+            # before K, so K and a following frame would be copied too. The segment muxer splits on K's
+            # presentation time instead (unshifted timestamps, as in assembly's split); segment 1 is unused.
+            steps.append((["ffmpeg", "-i", video_path, "-map", "0:v:0", "-c", "copy", "-t", f"{keyframe + 1:.3f}",
+                           "-avoid_negative_ts", "disabled", "-f", "segment", "-segment_times", f"{keyframe:.6f}",
+                           "-segment_time_delta", "0.001", "-segment_format", "mpegts",
+                           os.path.join(work_dir, "head_%d.ts"), "-y"], keyframe, 0.0, 60.0))
+        steps.append((["ffmpeg", "-ss", f"{keyframe:.3f}", "-i", video_path, "-map", "0:v:0",
+                       "-t", f"{out_dur - keyframe:.3f}", "-c:v", encoder[0], "-pix_fmt", encoder[1],
+                       "-f", "mpegts", tail, "-y"], out_dur - keyframe, 60.0, 30.0))
+
+        list_path = os.path.join(work_dir, "list.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for part in ([head] if keyframe > 0 else []) + [tail]:
+                f.write(f"file '{part.replace(os.sep, '/')}'\n")
+        joined = os.path.join(work_dir, "joined" + os.path.splitext(output_path)[1])
+        steps.append((["ffmpeg", "-f", "concat", "-safe", "0", "-i", list_path, "-i", video_path,
+                       "-map", "0:v:0", "-map", "1:a?", "-c", "copy", "-t", f"{out_dur:.3f}",
+                       joined, "-y"], out_dur, 90.0, 10.0))
+
+        for cmd, dur, offset, share in steps:
+            returncode, err_tail = run_ffmpeg(cmd, dur, stage(offset, share / 100.0), cancel_event=cancel_event)
+            if returncode != 0:
+                raise RuntimeError(err_tail)
+        os.replace(joined, output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return True
+
+
+def run_prepare(video_path, output_path=None, logo_path=None, wm_x="0", wm_y="0", trim_seconds=None, duration=0.0,
+                on_progress=None, stream_copy=True, accurate=False, cancel_event=None,
+                logo_width=None, target_speed=None, threads=None):
+    """
+    Runs the prepare step; returns the output path, raises on failure.
+    A logo always means one encode (overlay + trim together). Without one,
+    stream_copy remuxes/cuts without re-encoding; accurate additionally re-encodes
+    the GOP at the cut for a frame-exact end (see smart_trim).
+    target_speed / threads tune that encode (see choose_encode_profile).
+    """
+    output_path = output_path or prepared_output_path(video_path)
+    has_logo = bool(logo_path) and os.path.exists(logo_path)
+    out_dur = trimmed_duration(duration, trim_seconds) if trim_seconds is not None else duration
+
+    if not has_logo and stream_copy:
+        if accurate and trim_seconds is not None and smart_trim(video_path, output_path, out_dur, on_progress, cancel_event):
+            return output_path
+        if not accurate or trim_seconds is None:
+            cmd = build_copy_trim_command(video_path, output_path, out_dur if trim_seconds is not None else None)
+            returncode, err_tail = run_ffmpeg(cmd, out_dur, on_progress, cancel_event=cancel_event)
+            if returncode != 0 or not os.path.exists(output_path):
+                raise RuntimeError(err_tail)
+            return output_path
+        # Accurate cut requested but the source can't be smart-cut: full encode below
+
+    profile = choose_encode_profile(video_path, target_speed, threads)
+    cmd, out_dur = build_prepare_command(video_path, output_path, logo_path, wm_x, wm_y, trim_seconds, duration,
+                                         logo_width, profile)
+    last_speed = [0.0]
+    def progress(percent, fps, speed):
+        last_speed[0] = speed or last_speed[0] # ffmpeg's speed is the running average
+        if on_progress: on_progress(percent, fps, speed)
+
+    returncode, err_tail = run_ffmpeg(cmd, out_dur, progress, cancel_event=cancel_event)
+    if returncode != 0 or not os.path.exists(output_path):
+        raise RuntimeError(err_tail)
+    if out_dur >= MIN_MEASURE_SECONDS:
+        record_encode_speed(profile, last_speed[0])
+    return output_path
@@ -0,0 +1,249 @@
+import os
+import json
+import shutil
+import threading
+import traceback
+import uuid
+
+from cache_utils import get_cache_dir
+from assembly import assemble_video, AssemblyCancelled
+
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+DEFAULT_SLOTS = 1
+
+
+class RenderQueue:
+    """
+    Persistent queue of assembly jobs run on `slots` concurrent renders.
+    The highest priority queued job starts first (ties: oldest first).
+    Jobs are plain dicts saved to a JSON file on every state change; a job that
+    was running when the app stopped or crashed is queued again on load, and the
+    chunk cache makes the re-run skip the clips it had already encoded.
+    on_change(job_id) is called from worker threads after any job changes
+    (job_id is None for queue-wide changes).
+    """
+    def __init__(self, state_path=None, slots=DEFAULT_SLOTS, on_change=None):
+        self.state_path = state_path or os.path.join(get_cache_dir("queue"), "queue.json")
+        self.work_dir = os.path.dirname(self.state_path)
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._jobs = {} # job_id -> job dict (persisted)
+        self._seq = 0
+        self._held = False # Queue-wide pause: nothing new starts
+        self._slots = max(1, slots)
+        self._cancel_events = {} # job_id -> Event for running jobs
+        self._stop_as = {} # job_id -> state a stopped running job ends up in
+        self._threads = {}
+        self._closing = False
+        self._load()
+
+    # --- Persistence ---
+    def _load(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._seq = state.get("seq", 0)
+        self._held = state.get("held", False)
+        self._slots = max(1, state.get("slots", self._slots))
+        for job in state.get("jobs", []):
+            if job.get("status") == RUNNING:
+                job["status"] = QUEUED # Interrupted mid-render: resume it
+            job["progress"] = 100.0 if job.get("status") == DONE else 0.0
+            self._jobs[job["id"]] = job
+
+    def _save(self):
+        """ Caller holds the lock """
+        state = {"seq": self._seq, "held": self._held, "slots": self._slots,
+                 "jobs": sorted(self._jobs.values(), key=lambda j: j["seq"])}
+        tmp = f"{self.state_path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp, self.state_path) # Atomic: a crash never leaves half a file
+
+    def _notify(self, job_id=None):
+        if self.on_change:
+            self.on_change(job_id)
+
+    # --- Queries ---
+    def jobs(self):
+        """ Snapshot of all jobs in run order (running, then queued by priority, then the rest) """
+        rank = {RUNNING: 0, QUEUED: 1, PAUSED: 2}
+        with self._lock:
+            jobs = [dict(j) for j in self._jobs.values()]
+        return sorted(jobs, key=lambda j: (rank.get(j["status"], 3), -j["priority"], j["seq"]))
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    @property
+    def slots(self):
+        return self._slots
+
+    @property
+    def held(self):
+        return self._held
+
+    # --- Commands ---
+    def add(self, name, clip_data, output_path, settings, priority=0):
+        """ Queues an assemble_video job; returns its id """
+        with self._lock:
+            self._seq += 1
+            job_id = uuid.uuid4().hex[:12]
+            self._jobs[job_id] = {
+                "id": job_id, "seq": self._seq, "name": name, "priority": priority,
+                "status": QUEUED, "step": "", "progress": 0.0, "error": "", "result": "",
+                "clip_data": clip_data, "output_path": output_path, "settings": settings,
+            }
+            self._save()
+        self._notify(job_id)
+        self.schedule()
+        return job_id
+
+    def set_priority(self, job_id, priority):
+        with self._lock:
+            if job_id not in self._jobs: return
+            self._jobs[job_id]["priority"] = priority
+            self._save()
+        self._notify(job_id)
+        self.schedule()
+
+    def pause(self, job_id):
+        """ Holds a queued job; a running one is stopped and resumes from the chunk cache later """
+        self._stop_or_set(job_id, PAUSED, (QUEUED,))
+
+    def cancel(self, job_id):
+        self._stop_or_set(job_id, CANCELLED, (QUEUED, PAUSED))
+
+    def resume(self, job_id):
+        """ Puts a paused, failed or cancelled job back in the queue """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["status"] not in (PAUSED, FAILED, CANCELLED): return
+            job.update(status=QUEUED, error="", step="", progress=0.0)
+            self._save()
+        self._notify(job_id)
+        self.schedule()
+
+    def remove(self, job_id):
+        """ Forgets a job that is not running """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["status"] == RUNNING: return
+            del self._jobs[job_id]
+            self._save()
+        self._notify(None)
+
+    def _stop_or_set(self, job_id, new_status, from_states):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job: return
+            if job["status"] == RUNNING:
+                # The render thread records the final state once ffmpeg has exited
+                self._stop_as[job_id] = new_status
+                self._cancel_events[job_id].set()
+                job["step"] = "Stopping..."
+            elif job["status"] in from_states:
+                job["status"] = new_status
+                self._save()
+            else:
+                return
+        self._notify(job_id)
+        self.schedule()
+
+    def set_held(self, held):
+        """ Queue-wide pause: running renders finish, nothing new starts """
+        with self._lock:
+            self._held = held
+            self._save()
+        self._notify(None)
+        self.schedule()
+
+    def set_slots(self, slots):
+        with self._lock:
+            self._slots = max(1, slots)
+            self._save()
+        self._notify(None)
+        self.schedule()
+
+    # --- Scheduling ---
+    def schedule(self):
+        """ Starts queued jobs while render slots are free """
+        started = []
+        with self._lock:
+            if self._held or self._closing: return
+            running = sum(1 for j in self._jobs.values() if j["status"] == RUNNING)
+            queued = sorted((j for j in self._jobs.values() if j["status"] == QUEUED),
+                            key=lambda j: (-j["priority"], j["seq"]))
+            for job in queued[:max(0, self._slots - running)]:
+                job.update(status=RUNNING, step="Starting...", progress=0.0, error="")
+                self._cancel_events[job["id"]] = threading.Event()
+                thread = threading.Thread(target=self._run, args=(job["id"],), daemon=True)
+                self._threads[job["id"]] = thread
+                started.append((job["id"], thread))
+            if started:
+                self._save()
+        for job_id, thread in started:
+            self._notify(job_id)
+            thread.start()
+
+    def _run(self, job_id):
+        with self._lock:
+            job = self._jobs[job_id]
+            clip_data, output_path, settings = job["clip_data"], job["output_path"], job["settings"]
+            cancel_event = self._cancel_events[job_id]
+        temp_dir = os.path.join(self.work_dir, f"job_{job_id}")
+
+        def on_step(current, total, msg):
+            with self._lock:
+                job["step"] = msg
+            self._notify(job_id)
+
+        def on_progress(percent, fps, speed):
+            with self._lock:
+                job["progress"] = percent
+            self._notify(job_id)
+
+        status, result, error = DONE, "", ""
+        try:
+            result = assemble_video(clip_data, output_path, settings, temp_dir, on_step, on_progress, cancel_event)
+        except AssemblyCancelled:
+            status = None
+        except Exception as e:
+            traceback.print_exc()
+            status, error = FAILED, str(e)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        with self._lock:
+            if status is None:
+                status = self._stop_as.get(job_id, CANCELLED)
+            job.update(status=status, result=result, error=error,
+                       step="" if status != DONE else "Done", progress=100.0 if status == DONE else 0.0)
+            self._cancel_events.pop(job_id, None)
+            self._stop_as.pop(job_id, None)
+            self._threads.pop(job_id, None)
+            self._save()
+        self._notify(job_id)
+        self.schedule()
+
+    def shutdown(self, timeout=10.0):
+        """ Stops running renders; they are saved as queued and resume on the next start """
+        with self._lock:
+            self._closing = True
+            threads = list(self._threads.values())
+            for job_id, event in self._cancel_events.items():
+                self._stop_as[job_id] = QUEUED
+                event.set()
+        for thread in threads:
+            thread.join(timeout)
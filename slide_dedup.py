@@ -0,0 +1,102 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+HASH_SIZE = 8 # 8x8 -> 64-bit dHash
+DEFAULT_MAX_DISTANCE = 6 # Bits; cursor moves/webcam flicker stay well below this
+DUPLICATES_DIR = "duplicates"
+
+
+def dhash(path, hash_size=HASH_SIZE):
+    """ Difference hash: grayscale (size+1)x(size), one bit per left/right brightness step """
+    with Image.open(path) as img:
+        img.draft("L", (hash_size * 16, hash_size * 16)) # JPEG only: decode at reduced size
+        small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR, reducing_gap=2.0)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def group_runs(hashes, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    Splits consecutive hashes into runs of near-identical slides (index lists).
+    Each frame is compared with the run's first frame, not its predecessor, so
+    a slow scroll or a deck of similar slides can't drift into one long run.
+    """
+    runs = []
+    anchor = None
+    for i, h in enumerate(hashes):
+        if runs and h is not None and anchor is not None and hamming(h, anchor) <= max_distance:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+            anchor = h
+    return runs
+
+
+def dedupe_slides(directory, max_distance=DEFAULT_MAX_DISTANCE, max_workers=None, on_progress=None):
+    """
+    Collapses runs of near-duplicate frame_NNNN__MM-SS-mmm.png files.
+    Each run keeps its LAST image (the most complete state of a build) under the
+    run's FIRST timestamp, so the merged slide keeps the whole run's duration.
+    Dropped frames are moved to a 'duplicates' subfolder; kept frames are
+    renumbered so frame numbers match table rows. Returns (kept, removed) counts.
+    """
+    files = sorted(f for f in os.listdir(directory) if f.startswith("frame_") and "__" in f and f.lower().endswith(".png"))
+    if len(files) < 2:
+        return len(files), 0
+
+    paths = [os.path.join(directory, f) for f in files]
+    done = [0]
+    lock = threading.Lock()
+    def safe_hash(path):
+        try:
+            return dhash(path)
+        except Exception:
+            return None # Unreadable frame: never merged
+        finally:
+            with lock:
+                done[0] += 1
+                count = done[0]
+            if on_progress: on_progress(count, len(paths))
+
+    # Pillow releases the GIL while decoding, so threads parallelise fine
+    with ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 1)) as pool:
+        hashes = list(pool.map(safe_hash, paths))
+
+    runs = group_runs(hashes, max_distance)
+    removed = len(files) - len(runs)
+    if not removed:
+        return len(files), 0
+
+    dup_dir = os.path.join(directory, DUPLICATES_DIR)
+    os.makedirs(dup_dir, exist_ok=True)
+
+    # 1. Move everything but the last frame of each run aside
+    kept = [] # (current path, timestamp part of the run's first frame)
+    for run in runs:
+        ts_part = files[run[0]].split("__", 1)[1]
+        for i in run[:-1]:
+            os.replace(paths[i], os.path.join(dup_dir, files[i]))
+        kept.append((paths[run[-1]], ts_part))
+
+    # 2. Renumber via temp names so no rename can collide with a pending one
+    temp_paths = []
+    for j, (path, _) in enumerate(kept):
+        tmp = os.path.join(directory, f".dedup_{j:04d}.tmp")
+        os.rename(path, tmp)
+        temp_paths.append(tmp)
+    for j, (tmp, (_, ts_part)) in enumerate(zip(temp_paths, kept), start=1):
+        os.rename(tmp, os.path.join(directory, f"frame_{j:04d}__{ts_part}"))
+
+    return len(kept), removed
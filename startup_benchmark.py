@@ -0,0 +1,97 @@
+
+"""
+Startup budget check: cold import of main.py and time to the first shown window.
+
+  python startup_benchmark.py [--runs 5] [--import-budget 1.5] [--window-budget 2.5]
+
+Every run is a fresh interpreter on Qt's offscreen platform with a throwaway
+cache folder (so a persisted render queue never starts). Exits 1 when a median
+exceeds its budget or an AI-only module (requests, google, vertexai) was
+already imported at startup.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+DEFERRED_MODULES = ("requests", "google", "vertexai", "urllib3")
+
+
+def child():
+    """ Runs inside the measured interpreter; prints one JSON line """
+    start = time.perf_counter()
+    import main
+    import_s = time.perf_counter() - start
+    loaded = sorted({name.split(".")[0] for name in sys.modules} & set(DEFERRED_MODULES))
+
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    start = time.perf_counter()
+    window = main.VideoToolsApp()
+    window.show()
+    app.processEvents() # First paint
+    window_s = time.perf_counter() - start
+
+    print(json.dumps({"import": import_s, "window": window_s, "deferred_loaded": loaded}), flush=True)
+    window.render_queue.shutdown(0)
+    os._exit(0) # Skip Qt teardown: not part of startup
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Startup time benchmark")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--import-budget", type=float, default=1.5, help="Seconds for `import main`")
+    p.add_argument("--window-budget", type=float, default=2.5, help="Seconds from VideoToolsApp() to shown")
+    p.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+    if args.child:
+        child()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    with tempfile.TemporaryDirectory() as cache:
+        env = dict(os.environ, QT_QPA_PLATFORM="offscreen", VIDEO_TOOLS_CACHE=cache)
+        for i in range(args.runs):
+            start = time.perf_counter()
+            try:
+                res = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=here, env=env,
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=120)
+            except subprocess.TimeoutExpired:
+                print(f"Run {i+1} timed out (a modal dialog at startup?)", file=sys.stderr)
+                return 2
+            total = time.perf_counter() - start
+            try:
+                data = json.loads(res.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                print(f"Run {i+1} failed:\n{res.stderr[-2000:]}", file=sys.stderr)
+                return 2
+            data["process"] = total
+            results.append(data)
+            print(f"run {i+1}: import {data['import']:.3f}s  window {data['window']:.3f}s  process {total:.3f}s")
+
+    med_import = statistics.median(r["import"] for r in results)
+    med_window = statistics.median(r["window"] for r in results)
+    loaded = sorted({m for r in results for m in r["deferred_loaded"]})
+    print(f"median: import {med_import:.3f}s (budget {args.import_budget}s), "
+          f"window {med_window:.3f}s (budget {args.window_budget}s)")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: imported at startup: {', '.join(loaded)}")
+        failed = True
+    if med_import > args.import_budget:
+        print("FAIL: import over budget")
+        failed = True
+    if med_window > args.window_budget:
+        print("FAIL: first window over budget")
+        failed = True
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import subprocess
+import threading
+
+from ffmpeg_utils import get_subprocess_kwargs
+from cache_utils import DiskLRUCache, get_cache_dir, file_identity, make_cache_key
+
+THUMB_CACHE_MAX_BYTES = 256 * 1024 ** 2
+EVICT_EVERY = 50 # Puts between cache trims (listing the folder isn't free)
+
+_cache = None
+_cache_lock = threading.Lock()
+_puts = 0
+
+
+def get_thumb_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskLRUCache(get_cache_dir("thumbs"), THUMB_CACHE_MAX_BYTES, suffix=".jpg")
+        return _cache
+
+
+def extract_frame_jpeg(video_path, seek="00:00:01", vf="scale=-1:56"):
+    """ One frame as JPEG bytes straight from ffmpeg's stdout (nothing written next to the video) """
+    cmd = [
+        "ffmpeg", "-v", "error", "-ss", seek, "-i", video_path,
+        "-frames:v", "1", "-vf", vf,
+        "-f", "image2pipe", "-c:v", "mjpeg", "pipe:1"
+    ]
+    res = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, **get_subprocess_kwargs())
+    return res.stdout if res.returncode == 0 and res.stdout else None
+
+
+def get_video_thumbnail(video_path, seek="00:00:01", vf="scale=-1:56"):
+    """
+    Cached JPEG bytes for a frame of video_path, or None.
+    Keyed by file identity + seek + filter, so reopening a project never re-extracts.
+    Safe to call off the GUI thread.
+    """
+    global _puts
+    try:
+        key = make_cache_key("thumb", file_identity(video_path), seek, vf)
+    except OSError:
+        return None
+
+    cache = get_thumb_cache()
+    data = cache.get_bytes(key)
+    if data:
+        return data
+
+    try:
+        data = extract_frame_jpeg(video_path, seek, vf)
+    except FileNotFoundError:
+        raise # ffmpeg missing - let the caller report it
+    except Exception:
+        return None
+    if not data:
+        return None
+
+    try:
+        cache.put_bytes(key, data)
+        with _cache_lock:
+            _puts += 1
+            trim = _puts % EVICT_EVERY == 0
+        if trim:
+            cache.evict()
+    except OSError:
+        pass # Cache is best-effort
+    return data
@@ -0,0 +1,393 @@
+import os
+import json
+import time
+import base64
+import shutil
+import random
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# requests / google-auth are imported where first used: importing this module
+# (as main.py does at startup) must stay cheap for users who never touch the AI path
+from cache_utils import DiskLRUCache, get_cache_dir, make_cache_key
+
+API_ENDPOINT_TEMPLATE = "https://us-central1-aiplatform.googleapis.com/v1/projects/{PROJECT_ID}/locations/us-central1/publishers/google/models/{MODEL_ID}:predict"
+# Points the client at another server (e.g. vertex_stub_server.py); same placeholders
+ENDPOINT_ENV_VAR = "VERTEX_API_ENDPOINT"
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0 # Seconds; doubled per attempt, with jitter
+BACKOFF_MAX = 60.0
+REQUEST_TIMEOUT = 120.0
+
+POLL_INTERVAL = 10.0 # Long-running operation status checks
+POLL_TIMEOUT = 20 * 60.0
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_MINUTE = 10 # Prediction submits; polls are not counted against it
+POOL_SIZE = 16
+TOKEN_REFRESH_MARGIN = 300.0 # Seconds before expiry at which the access token is renewed
+METRICS_WINDOW = 500 # Latest calls per method kept for percentiles
+
+# Generated clips are paid for: keep plenty. Bump the version if the request shape changes.
+GENERATION_CACHE_VERSION = 1
+GENERATION_CACHE_MAX_BYTES = 20 * 1024 ** 3
+
+
+class VertexError(Exception):
+    pass
+
+
+class VertexOperationFailed(VertexError):
+    """ The prediction itself finished with an error (as opposed to a transport failure) """
+
+
+class TokenBucket:
+    """ Thread-safe token bucket: `rate` tokens/second, bursts of up to `capacity` """
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel_event=None):
+        """ Blocks until a token is available. Returns False if cancel_event was set first """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if cancel_event is not None:
+                if cancel_event.wait(wait): return False
+            else:
+                time.sleep(wait)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """ Seconds to wait before retry `attempt` (0-based); honours a Retry-After header """
+    try:
+        if retry_after is not None:
+            return min(BACKOFF_MAX, float(retry_after))
+    except ValueError:
+        pass # HTTP-date form: fall back to exponential
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+class CallMetrics:
+    """ Per-method call latencies (seconds) and outcomes; thread-safe """
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self._calls = {} # method -> deque of (latency, status)
+        self._counts = {} # method -> [calls, errors]
+        self._lock = threading.Lock()
+
+    def record(self, method, latency, status):
+        """ status: HTTP code, or 0 for a connection error """
+        with self._lock:
+            self._calls.setdefault(method, deque(maxlen=self.window)).append((latency, status))
+            counts = self._counts.setdefault(method, [0, 0])
+            counts[0] += 1
+            if not 200 <= status < 300:
+                counts[1] += 1
+
+    def summary(self):
+        """ {method: {calls, errors, mean, p50, p95, max}} over the recent window """
+        out = {}
+        with self._lock:
+            for method, calls in self._calls.items():
+                latencies = sorted(l for l, _ in calls)
+                n = len(latencies)
+                out[method] = {
+                    "calls": self._counts[method][0], "errors": self._counts[method][1],
+                    "mean": sum(latencies) / n, "p50": latencies[n // 2],
+                    "p95": latencies[min(n - 1, int(n * 0.95))], "max": latencies[-1],
+                }
+        return out
+
+    def format(self):
+        return ", ".join(f"{m}: {s['calls']} calls ({s['errors']} err) p50 {s['p50']*1000:.0f}ms p95 {s['p95']*1000:.0f}ms"
+                         for m, s in self.summary().items())
+
+
+def load_service_account(key_path):
+    """ (credentials, project_id) from a service account JSON key """
+    from google.oauth2 import service_account
+    with open(key_path, "r", encoding="utf-8") as f:
+        info = json.load(f)
+    credentials = service_account.Credentials.from_service_account_info(
+        info, scopes=["https://www.googleapis.com/auth/cloud-platform"])
+    return credentials, info.get("project_id", "")
+
+
+class VertexClient:
+    """
+    Vertex AI REST client over one pooled requests.Session (keep-alive, shared by threads).
+    The key is read once; the access token is reused until it is within
+    TOKEN_REFRESH_MARGIN of expiry. Every HTTP attempt (and token refresh) is
+    timed into self.metrics. Without a key_path no Authorization header is sent,
+    which is what a local stub expects. Prefer get_vertex_client() to share one.
+    """
+    def __init__(self, key_path=None, endpoint_template=None, project_id=None, pool_size=POOL_SIZE):
+        self.endpoint_template = endpoint_template or os.environ.get(ENDPOINT_ENV_VAR) or API_ENDPOINT_TEMPLATE
+        self.credentials = None
+        self.project_id = project_id or ""
+        if key_path:
+            self.credentials, key_project = load_service_account(key_path)
+            self.project_id = self.project_id or key_project
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._auth_lock = threading.Lock()
+        self.metrics = CallMetrics()
+
+    def _token_fresh(self):
+        creds = self.credentials
+        if not creds.token:
+            return False
+        if creds.expiry is None:
+            return True
+        # google-auth keeps expiry as naive UTC
+        return creds.expiry - datetime.now(timezone.utc).replace(tzinfo=None) > timedelta(seconds=TOKEN_REFRESH_MARGIN)
+
+    def auth_headers(self):
+        if self.credentials is None:
+            return {}
+        if not self._token_fresh():
+            with self._auth_lock:
+                if not self._token_fresh(): # Another thread may have refreshed meanwhile
+                    import google.auth.transport.requests
+                    start = time.perf_counter()
+                    self.credentials.refresh(google.auth.transport.requests.Request(session=self.session))
+                    self.metrics.record("token_refresh", time.perf_counter() - start, 200)
+        return {"Authorization": f"Bearer {self.credentials.token}"}
+
+    def model_url(self, model, method):
+        """ Endpoint for model with its ':method' suffix swapped (predict, predictLongRunning, ...) """
+        url = self.endpoint_template.format(PROJECT_ID=self.project_id, MODEL_ID=model)
+        head, _, tail = url.rpartition("/")
+        return f"{head}/{tail.split(':')[0]}:{method}"
+
+    def post(self, url, payload, cancel_event=None):
+        """ POST JSON with exponential backoff on 429/5xx and connection errors; returns parsed JSON """
+        import requests
+        method = url.rpartition(":")[2]
+        for attempt in range(MAX_RETRIES + 1):
+            retry_after = None
+            headers = self.auth_headers()
+            start = time.perf_counter()
+            try:
+                res = self.session.post(url, json=payload, headers=headers, timeout=REQUEST_TIMEOUT)
+                self.metrics.record(method, time.perf_counter() - start, res.status_code)
+                if res.status_code not in RETRY_STATUS:
+                    if not res.ok:
+                        raise VertexError(f"HTTP {res.status_code}: {res.text[:500]}")
+                    return res.json()
+                retry_after = res.headers.get("Retry-After")
+                error = f"HTTP {res.status_code}: {res.text[:200]}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.record(method, time.perf_counter() - start, 0)
+                error = str(e)
+            if attempt == MAX_RETRIES:
+                raise VertexError(f"Giving up after {MAX_RETRIES + 1} attempts: {error}")
+            delay = backoff_delay(attempt, retry_after)
+            if cancel_event is not None:
+                if cancel_event.wait(delay): raise VertexError("Cancelled")
+            else:
+                time.sleep(delay)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_vertex_client(key_path=None, endpoint_template=None):
+    """
+    Process-wide VertexClient per (key file, endpoint): credentials, token and
+    connection pool are reused by every batch. Replacing the key file starts a new client.
+    """
+    key = (endpoint_template or os.environ.get(ENDPOINT_ENV_VAR) or API_ENDPOINT_TEMPLATE,)
+    if key_path:
+        st = os.stat(key_path)
+        key += (os.path.abspath(key_path), st.st_mtime_ns)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = VertexClient(key_path, endpoint_template)
+        return client
+
+
+def _video_bytes(response):
+    """ First video in a prediction / operation response, decoded """
+    samples = response.get("videos") or response.get("predictions") or response.get("generatedSamples") or []
+    for sample in samples:
+        video = sample.get("video", sample)
+        data = video.get("bytesBase64Encoded")
+        if data:
+            return base64.b64decode(data)
+        if video.get("gcsUri"):
+            raise VertexError(f"Video was written to {video['gcsUri']}; inline results are required.")
+    raise VertexError("Response contained no video.")
+
+
+def generate_video(client, image_path, model, prompt, duration, out_path, bucket=None,
+                   cancel_event=None, poll_interval=POLL_INTERVAL, poll_timeout=POLL_TIMEOUT,
+                   operation_name=None, on_submitted=None):
+    """
+    One image-to-video prediction: submit, poll the long-running operation, write the MP4.
+    operation_name resumes polling an operation submitted earlier (resubmits if it is
+    unknown); on_submitted(name) sees the name of a fresh submission.
+    """
+    with open(image_path, "rb") as f:
+        image_b64 = base64.b64encode(f.read()).decode("ascii")
+    mime = "image/jpeg" if image_path.lower().endswith((".jpg", ".jpeg")) else "image/png"
+    payload = {
+        "instances": [{"prompt": prompt, "image": {"bytesBase64Encoded": image_b64, "mimeType": mime}}],
+        "parameters": {"durationSeconds": int(duration), "sampleCount": 1},
+    }
+
+    op = None
+    if operation_name:
+        try:
+            op = client.post(client.model_url(model, "fetchPredictOperation"), {"operationName": operation_name}, cancel_event)
+        except VertexError:
+            op = None # Expired or unknown: submit again
+    if op is None:
+        if bucket is not None and not bucket.acquire(cancel_event):
+            raise VertexError("Cancelled")
+        op = client.post(client.model_url(model, "predictLongRunning"), payload, cancel_event)
+        if on_submitted and op.get("name"):
+            on_submitted(op["name"])
+
+    deadline = time.monotonic() + poll_timeout
+    while not op.get("done", "name" not in op): # A plain prediction response is already "done"
+        if time.monotonic() > deadline:
+            raise VertexError(f"Timed out waiting for {op['name']}")
+        if cancel_event is not None:
+            if cancel_event.wait(poll_interval): raise VertexError("Cancelled")
+        else:
+            time.sleep(poll_interval)
+        op = client.post(client.model_url(model, "fetchPredictOperation"), {"operationName": op["name"]}, cancel_event)
+
+    if op.get("error"):
+        raise VertexOperationFailed(op["error"].get("message", str(op["error"])))
+    data = _video_bytes(op.get("response", op))
+
+    tmp = f"{out_path}.part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def generated_video_path(image_path, out_dir):
+    """ Output keeps the slide's base name, so its frame number still maps to the table row """
+    return os.path.join(out_dir, os.path.splitext(os.path.basename(image_path))[0] + ".mp4")
+
+
+def generation_cache_key(image_path, model, prompt, duration):
+    """ Content key of one prediction: the image bytes (not its path) plus the request """
+    with open(image_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return make_cache_key(GENERATION_CACHE_VERSION, digest, model, prompt, int(duration))
+
+
+def open_generation_cache(max_bytes=GENERATION_CACHE_MAX_BYTES):
+    return DiskLRUCache(get_cache_dir("vertex"), max_bytes, suffix=".mp4")
+
+
+class PendingOperations:
+    """
+    Operation names of submitted-but-unfinished predictions, one small file per
+    cache key, so a rerun after a crash or network failure polls the operation it
+    already paid for instead of submitting again.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or get_cache_dir("vertex_pending")
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.op")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def put(self, key, name):
+        tmp = f"{self._path(key)}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(tmp, self._path(key))
+
+    def remove(self, key):
+        try: os.remove(self._path(key))
+        except OSError: pass
+
+
+def generate_videos(client, image_paths, model, prompt, duration, out_dir,
+                    max_workers=DEFAULT_CONCURRENCY, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                    on_done=None, cancel_event=None, poll_interval=POLL_INTERVAL, use_cache=True):
+    """
+    Runs predictions for many images concurrently; submits are paced by a token bucket.
+    With use_cache, results are stored by generation_cache_key: a rerun copies finished
+    clips from the cache and resumes pending operations, so nothing is paid for twice.
+    on_done(index, path, error, cached) fires as each one finishes (path None on failure).
+    Returns {index: path or None}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    bucket = TokenBucket(requests_per_minute / 60.0, capacity=max(1, max_workers))
+    cache = open_generation_cache() if use_cache else None
+    pending = PendingOperations() if use_cache else None
+    results = {}
+
+    def run(i, image_path):
+        out_path = generated_video_path(image_path, out_dir)
+        if cache is None:
+            return generate_video(client, image_path, model, prompt, duration, out_path,
+                                  bucket, cancel_event, poll_interval), False
+
+        key = generation_cache_key(image_path, model, prompt, duration)
+        cached = cache.get(key)
+        if cached:
+            shutil.copyfile(cached, out_path)
+            return out_path, True
+        try:
+            generate_video(client, image_path, model, prompt, duration, out_path, bucket, cancel_event, poll_interval,
+                           operation_name=pending.get(key), on_submitted=lambda name: pending.put(key, name))
+        except VertexOperationFailed:
+            pending.remove(key) # Finished with an error: a rerun must submit again
+            raise
+        tmp = f"{cache.path_for(key)}.in"
+        shutil.copyfile(out_path, tmp)
+        cache.put(key, tmp)
+        pending.remove(key)
+        return out_path, False
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(run, i, p): i for i, p in enumerate(image_paths)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                (path, cached), error = future.result(), ""
+            except Exception as e:
+                path, cached, error = None, False, str(e)
+            results[i] = path
+            if on_done:
+                on_done(i, path, error, cached)
+
+    if cache is not None:
+        cache.evict()
+    return results
@@ -0,0 +1,90 @@
+
+"""
+Local stand-in for the Vertex AI video endpoints, for trying the generation worker offline.
+
+  python vertex_stub_server.py --port 8765 --fail-rate 0.3
+  VERTEX_API_ENDPOINT="http://127.0.0.1:8765/v1/projects/{PROJECT_ID}/models/{MODEL_ID}:predict" python main.py
+
+predictLongRunning returns an operation that completes after --delay seconds;
+fetchPredictOperation returns it, with a tiny placeholder "MP4" once done.
+--fail-rate answers that share of requests with 429/503 to exercise the backoff.
+"""
+import sys
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+operations = {} # name -> ready time
+lock = threading.Lock()
+args = None
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real endpoint
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if random.random() < args.fail_rate:
+            status = random.choice([429, 503])
+            return self.send_json(status, {"error": {"code": status, "message": "stub: try again"}}, {"Retry-After": "1"})
+
+        if self.path.endswith(":predictLongRunning"):
+            name = f"{self.path.rsplit(':', 1)[0].lstrip('/')}/operations/{uuid.uuid4().hex}"
+            with lock:
+                operations[name] = time.monotonic() + args.delay
+            return self.send_json(200, {"name": name})
+
+        if self.path.endswith(":fetchPredictOperation"):
+            name = payload.get("operationName", "")
+            with lock:
+                ready = operations.get(name)
+            if ready is None:
+                return self.send_json(404, {"error": {"code": 404, "message": f"unknown operation {name}"}})
+            if time.monotonic() < ready:
+                return self.send_json(200, {"name": name, "done": False})
+            video = base64.b64encode(b"\x00\x00\x00\x18ftypmp42stub").decode("ascii")
+            return self.send_json(200, {"name": name, "done": True,
+                                        "response": {"videos": [{"bytesBase64Encoded": video, "mimeType": "video/mp4"}]}})
+
+        self.send_json(404, {"error": {"code": 404, "message": "unknown method"}})
+
+    def log_message(self, fmt, *a):
+        if args.verbose:
+            super().log_message(fmt, *a)
+
+
+def main(argv=None):
+    global args
+    p = argparse.ArgumentParser(description="Vertex AI stub server")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--delay", type=float, default=3.0, help="Seconds until an operation is done")
+    p.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered 429/503")
+    p.add_argument("--verbose", action="store_true")
+    args = p.parse_args(argv)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    print(f"Stub Vertex endpoint: http://127.0.0.1:{args.port}/v1/projects/{{PROJECT_ID}}/models/{{MODEL_ID}}:predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
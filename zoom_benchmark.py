@@ -0,0 +1,115 @@
+"""
+Ken Burns benchmark: the old zoompan recipe against the kenburns frame generator.
+
+  python zoom_benchmark.py [slide.png] [--duration 5] [--zoom 110] [--runs 3] [--min-ssim 0.95]
+
+Both render the same clip with the same encoder, video only, fresh every run.
+Without an image a 1920x1080 test pattern is used (fine detail shows jitter).
+Parity is SSIM/PSNR of the generator's clip against the zoompan clip. Small,
+detailed slides score lower: the generator upscales them with Lanczos, which
+is sharper than zoompan's bilinear 2x pass, not a different zoom path.
+Exits 1 when the generator is not faster or SSIM is below --min-ssim.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from ffmpeg_utils import get_subprocess_kwargs, run_ffmpeg
+from ffmpeg_caps import get_capabilities
+from kenburns import build_zoom_command
+
+
+def zoompan_command(image, output, duration, zoom_factor, encoder):
+    """ The chunk recipe before kenburns: zoompan at 2x, scaled down every frame """
+    d_frames = int(duration * 30)
+    z_expr = f"1+({zoom_factor}-1)*(on/{d_frames})"
+    zoom_filter = f"zoompan=z='{z_expr}':x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':d={d_frames}:s=2560x1440:fps=30,scale=1280:720"
+    return [
+        "ffmpeg", "-loop", "1", "-i", image,
+        "-filter_complex", f"[0:v]{zoom_filter}[v]", "-map", "[v]",
+        "-c:v", encoder, "-pix_fmt", "yuv420p", "-t", str(duration), "-y", output
+    ]
+
+
+def time_render(render):
+    start = time.perf_counter()
+    returncode, err_tail = render()
+    if returncode != 0:
+        raise RuntimeError(err_tail)
+    return time.perf_counter() - start
+
+
+def compare(reference, candidate, metric):
+    """ ffmpeg ssim/psnr of candidate against reference -> the 'All'/'average' value """
+    res = subprocess.run(["ffmpeg", "-hide_banner", "-i", candidate, "-i", reference, "-lavfi", metric, "-f", "null", "-"],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, **get_subprocess_kwargs())
+    match = re.search(r"All:([\d.]+)" if metric == "ssim" else r"average:([\d.]+|inf)", res.stderr)
+    return float(match.group(1)) if match else 0.0
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Ken Burns zoom benchmark")
+    p.add_argument("image", nargs="?", help="Slide image (default: generated test pattern)")
+    p.add_argument("--duration", type=float, default=5.0)
+    p.add_argument("--zoom", type=int, default=110, help="Zoom amount in percent")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--min-ssim", type=float, default=0.95)
+    args = p.parse_args(argv)
+
+    caps = get_capabilities()
+    if not caps.available:
+        print("Error: ffmpeg not found on PATH.", file=sys.stderr)
+        return 2
+    encoder = caps.h264_encoder()
+    zoom_factor = args.zoom / 100.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image = args.image
+        if not image:
+            image = os.path.join(tmp, "pattern.png")
+            run_ffmpeg(["ffmpeg", "-f", "lavfi", "-i", "testsrc2=size=1920x1080", "-frames:v", "1", "-y", image])
+        old_out = os.path.join(tmp, "zoompan.mp4")
+        new_out = os.path.join(tmp, "kenburns.mp4")
+
+        def render_old():
+            return run_ffmpeg(zoompan_command(image, old_out, args.duration, zoom_factor, encoder), args.duration)
+
+        def render_new():
+            cmd = build_zoom_command(image, ["-map", "0:v", "-c:v", encoder, "-pix_fmt", "yuv420p",
+                                             "-t", str(args.duration), "-y", new_out], args.duration, zoom_factor)
+            return run_ffmpeg(cmd.argv, args.duration, stdin_chunks=cmd.stdin_chunks)
+
+        old_times, new_times = [], []
+        for i in range(args.runs):
+            # Alternate the order so neither side always runs on a warm cache
+            pair = [(old_times, render_old), (new_times, render_new)]
+            for times, render in (pair if i % 2 == 0 else pair[::-1]):
+                times.append(time_render(render))
+            print(f"run {i+1}: zoompan {old_times[-1]:.2f}s  generator {new_times[-1]:.2f}s")
+
+        ssim = compare(old_out, new_out, "ssim")
+        psnr = compare(old_out, new_out, "psnr")
+
+    med_old = statistics.median(old_times)
+    med_new = statistics.median(new_times)
+    print(f"median: zoompan {med_old:.2f}s, generator {med_new:.2f}s ({med_old / med_new:.2f}x faster)")
+    print(f"parity: SSIM {ssim:.4f} (min {args.min_ssim}), PSNR {psnr:.2f} dB")
+
+    failed = False
+    if med_new >= med_old:
+        print("FAIL: generator not faster")
+        failed = True
+    if ssim < args.min_ssim:
+        print("FAIL: generator output differs from zoompan")
+        failed = True
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())